@@ -1,15 +1,20 @@
 import asyncio
 import datetime
 import html
-from typing import Annotated, Literal
+import random
+from typing import TYPE_CHECKING, Annotated, Literal, TypeVar
 
-import aiohttp
+import metrics
 import pydantic
 
+if TYPE_CHECKING:
+    import aiohttp
+
 
 class OpenTriviaQuestion(pydantic.BaseModel):
     type: str
     category: str
+    difficulty: str
     text: Annotated[str, pydantic.AfterValidator(html.unescape)] = pydantic.Field(
         validation_alias="question"
     )
@@ -21,16 +26,42 @@ class OpenTriviaQuestion(pydantic.BaseModel):
     model_config = pydantic.ConfigDict(populate_by_name=True)
 
 
-
 class OpenTriviaResponse(pydantic.BaseModel):
     response_code: int
     results: list[OpenTriviaQuestion]
 
 
+ResponseModel = TypeVar("ResponseModel", bound=pydantic.BaseModel)
+Difficulty = Literal["easy", "medium", "hard"]
+
+
+class OpenTriviaError(Exception):
+    def __init__(self, response_code: int) -> None:
+        super().__init__(f"OpenTDB request failed with response code {response_code}")
+        self.response_code = response_code
+
+
+class OpenTriviaTokenResponse(pydantic.BaseModel):
+    response_code: int
+    token: str = ""
+
+
 class OpenTriviaDB:
     encoding: Literal["default", "legacy", "url", "base64"] = "default"
-    diff_map = {"easy": 0, "medium": 1, "hard": 2}
     timeout: datetime.timedelta = datetime.timedelta(seconds=5)
+    # OpenTDB allows a single request per IP every 5 seconds.
+    min_interval: datetime.timedelta = datetime.timedelta(seconds=5)
+    max_retries: int = 3
+    backoff: datetime.timedelta = datetime.timedelta(seconds=1)
+    pool_size: int = 4
+
+    token_path: str = "/api_token.php"
+
+    SUCCESS = 0
+    NO_RESULTS = 1
+    TOKEN_NOT_FOUND = 3
+    TOKEN_EMPTY = 4
+    RATE_LIMIT = 5
 
     def __init__(
         self,
@@ -42,32 +73,148 @@ class OpenTriviaDB:
         self.base_url = base_url
         self.api_path = api_path
 
+        self.session: aiohttp.ClientSession | None = None
+        # Created with the session it guards, so it belongs to the loop the client runs on.
+        self.rate_limit_lock: asyncio.Lock | None = None
+        self.last_request_at = float("-inf")
+        self.inflight: dict[tuple, asyncio.Future[list[OpenTriviaQuestion]]] = {}
+        # Session tokens keep OpenTDB from serving the same question twice to one consumer.
+        self.tokens: dict[str, str] = {}
+
+    async def start(self) -> None:
+        if self.session is not None:
+            return
+
+        # aiohttp is slow to import, so workers only pay for it once they start.
+        import aiohttp
+
+        self.rate_limit_lock = asyncio.Lock()
         self.session = aiohttp.ClientSession(
             base_url=self.base_url,
-            loop=asyncio.get_event_loop(),
+            timeout=aiohttp.ClientTimeout(total=self.timeout.total_seconds()),
+            connector=aiohttp.TCPConnector(
+                limit=self.pool_size, ttl_dns_cache=300, keepalive_timeout=30
+            ),
         )
 
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+            self.rate_limit_lock = None
+
     async def get(
         self,
         amount: int,
         category: int | None = None,
-        difficulty: Literal["easy", "medium", "hard"] | None = None,
+        difficulty: Difficulty | None = None,
+        token_key: str | None = None,
     ) -> list[OpenTriviaQuestion]:
-        params = {"amount": amount}
+        params: dict[str, int | str] = {"amount": amount}
 
         if category is not None:
             params["category"] = category
 
         if difficulty is not None:
-            params["difficulty"] = self.diff_map[difficulty]
+            params["difficulty"] = difficulty
 
-        response = await self.session.get(self.api_path, params=params)
-        response.raise_for_status()
+        # Identical requests already in flight share one round trip.
+        key = (*sorted(params.items()), token_key)
+        future = self.inflight.get(key)
 
-        raw = await response.read()
-        body = OpenTriviaResponse.model_validate_json(raw)
+        if future is None:
+            future = self.inflight[key] = asyncio.ensure_future(self.fetch(params, token_key))
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
 
-        return body.results
+        with metrics.OPENTDB_REQUEST_SECONDS.time():
+            try:
+                return await asyncio.shield(future)
+            except Exception:
+                metrics.OPENTDB_ERRORS.inc()
+                raise
+
+    async def fetch(
+        self, params: dict[str, int | str], token_key: str | None = None
+    ) -> list[OpenTriviaQuestion]:
+        import aiohttp
+
+        attempt = 0
+
+        while True:
+            try:
+                if token_key is not None:
+                    params["token"] = await self.get_token(token_key)
+                body = await self.request(self.api_path, params, OpenTriviaResponse)
+            except aiohttp.ClientResponseError as exc:
+                if exc.status < 500 and exc.status != 429:
+                    raise
+                error: Exception = exc
+            except (aiohttp.ClientError, TimeoutError) as exc:
+                error = exc
+            else:
+                if body.response_code in (self.SUCCESS, self.NO_RESULTS):
+                    return body.results
+                if token_key is not None and body.response_code == self.TOKEN_NOT_FOUND:
+                    self.tokens.pop(token_key, None)
+                elif token_key is not None and body.response_code == self.TOKEN_EMPTY:
+                    # Every question has been served under this token, start the cycle over.
+                    await self.reset_token(token_key)
+                elif body.response_code != self.RATE_LIMIT:
+                    raise OpenTriviaError(body.response_code)
+                error = OpenTriviaError(body.response_code)
+
+            if attempt == self.max_retries:
+                raise error
+
+            delay = self.backoff.total_seconds() * 2**attempt
+            await asyncio.sleep(random.uniform(delay / 2, delay * 1.5))
+            attempt += 1
+
+    async def wait_for_rate_limit(self) -> None:
+        assert self.rate_limit_lock is not None
+        async with self.rate_limit_lock:
+            loop = asyncio.get_running_loop()
+            delay = self.last_request_at + self.min_interval.total_seconds() - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.last_request_at = loop.time()
+
+    async def get_token(self, token_key: str) -> str:
+        token = self.tokens.get(token_key)
+
+        if token is None:
+            body = await self.request(
+                self.token_path, {"command": "request"}, OpenTriviaTokenResponse
+            )
+            if body.response_code != self.SUCCESS:
+                raise OpenTriviaError(body.response_code)
+            token = self.tokens[token_key] = body.token
+
+        return token
+
+    async def reset_token(self, token_key: str) -> None:
+        token = self.tokens.pop(token_key, None)
+        if token is None:
+            return
+
+        body = await self.request(
+            self.token_path, {"command": "reset", "token": token}, OpenTriviaTokenResponse
+        )
+        if body.response_code == self.SUCCESS:
+            self.tokens[token_key] = body.token or token
+
+    async def request(
+        self, path: str, params: dict[str, int | str], model: type[ResponseModel]
+    ) -> ResponseModel:
+        await self.start()
+        await self.wait_for_rate_limit()
+
+        assert self.session is not None
+        async with self.session.get(path, params=params) as response:
+            response.raise_for_status()
+            raw = await response.read()
+
+        return model.model_validate_json(raw)
 
 
 _DB = OpenTriviaDB(
@@ -79,3 +226,7 @@ _DB = OpenTriviaDB(
 
 async def get_open_trivia_db() -> OpenTriviaDB:
     return _DB
+
+
+async def close_open_trivia_db() -> None:
+    await _DB.close()
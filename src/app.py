@@ -6,21 +6,131 @@ import litestar.di
 import litestar.events
 import litestar.handlers
 import litestar.status_codes
+import metrics
 import session
+import static
+import stores
 import utils
-from api import get_open_trivia_db
+from api import OpenTriviaDB, close_open_trivia_db, get_open_trivia_db
+from bank import QuestionBank, close_question_bank, get_question_bank
 from litestar.config.compression import CompressionConfig
 from litestar.config.csrf import CSRFConfig
 from litestar.contrib.htmx.response import HTMXTemplate
+from litestar.datastructures import State
+from litestar.enums import MediaType
 from litestar.logging import LoggingConfig
 from litestar.response import Redirect, Template
-from litestar.static_files import create_static_files_router
-from litestar.stores.file import FileStore
 
 
-def on_startup():
+# Every object the app runs on is built here, on the loop that serves it, and kept on app.state.
+# on_shutdown closes and drops them, so the next lifecycle starts from fresh ones.
+async def on_startup(app: litestar.Litestar):
     config.ASSETS_DIR.mkdir(exist_ok=True)
     config.STORE_PATH.mkdir(exist_ok=True)
+    config.attach_template_bytecode_cache()
+    session.load_templates()
+    static.get_asset_manifest()
+    utils.get_avatars()
+
+    trivia_db = await get_open_trivia_db()
+    await trivia_db.start()
+
+    question_bank = await get_question_bank(trivia_db)
+    question_bank.start_refilling()
+
+    session_manager = await session.get_game_session_manager(trivia_db, question_bank)
+    bus = session.get_broadcast_bus()
+    bus.subscribe(
+        lambda message: session_manager.adopt_session(message.game_session), remote_only=True
+    )
+    bus.subscribe(session.GameWebsocketListener.deliver)
+    await bus.start()
+
+    sweeper = session.get_room_sweeper(session_manager)
+    sweeper.start()
+
+    app.state.update(
+        trivia_db=trivia_db,
+        question_bank=question_bank,
+        session_manager=session_manager,
+        broadcast_bus=bus,
+        room_sweeper=sweeper,
+    )
+    register_gauges(session_manager, sweeper)
+
+
+def register_gauges(
+    session_manager: session.GameSessionManager, sweeper: session.RoomSweeper
+) -> None:
+    sockets = session.GameWebsocketListener.sockets
+    debouncer = session.get_broadcast_debouncer()
+    store_path = config.STORE_PATH / "game_sessions"
+
+    metrics.gauge(
+        "triviamx_active_rooms", "Rooms held in memory.", lambda: len(session_manager.sessions)
+    )
+    metrics.gauge(
+        "triviamx_sockets", "Open game websockets.", lambda: sum(map(len, sockets.values()))
+    )
+    metrics.gauge(
+        "triviamx_pending_timers",
+        "Scheduled round timers.",
+        lambda: len(session.get_timer_scheduler()),
+    )
+    metrics.gauge(
+        "triviamx_store_sessions",
+        "Game sessions stored on disk.",
+        lambda: sum(1 for _ in store_path.iterdir()) if store_path.exists() else 0,
+    )
+    metrics.gauge(
+        "triviamx_dirty_sessions",
+        "Sessions waiting to be flushed.",
+        lambda: len(session_manager.dirty),
+    )
+    metrics.counter_func(
+        "triviamx_rooms_reclaimed_total", "Idle rooms reclaimed.", lambda: sweeper.reclaimed_rooms
+    )
+    metrics.counter_func(
+        "triviamx_broadcasts_submitted_total",
+        "Broadcasts submitted to the debouncer.",
+        lambda: debouncer.submitted,
+    )
+    metrics.counter_func(
+        "triviamx_broadcasts_published_total",
+        "Broadcasts published after coalescing.",
+        lambda: debouncer.published,
+    )
+
+
+@litestar.get("/metrics", media_type=MediaType.TEXT)
+async def metrics_endpoint() -> str:
+    return metrics.REGISTRY.render()
+
+
+async def on_shutdown(app: litestar.Litestar):
+    await session.stop_room_sweeper()
+    await session.close_broadcast_bus()
+    await session.close_game_session_manager()
+    await close_question_bank()
+    await close_open_trivia_db()
+    session.close_timer_scheduler()
+    session.close_broadcast_debouncer()
+    session.GameWebsocketListener.forget_rooms()
+
+    for key in ("trivia_db", "question_bank", "session_manager", "broadcast_bus", "room_sweeper"):
+        app.state.pop(key, None)
+
+
+async def provide_trivia_db(state: State) -> OpenTriviaDB:
+    return state.trivia_db
+
+
+async def provide_question_bank(state: State) -> QuestionBank:
+    return state.question_bank
+
+
+async def provide_session_manager(state: State) -> session.GameSessionManager:
+    return state.session_manager
 
 
 @litestar.get("/", status_code=litestar.status_codes.HTTP_302_FOUND)
@@ -51,40 +161,46 @@ async def room(
 
     return HTMXTemplate(
         template_name="index.html",
-        context=data.model_dump(),
+        context=data.as_context(),
         push_url=f"/{game_session.id}",
     )
 
-app = litestar.Litestar(
-    route_handlers=[
-        index,
-        room,
-        create_static_files_router(path="/static", directories=[config.ASSETS_DIR]),
-        session.GameWebsocketListener,
-    ],
-    csrf_config=CSRFConfig(secret="test-secret"),
-    compression_config=CompressionConfig(backend="gzip"),
-    template_config=config.template_config,
-    logging_config=LoggingConfig(
-        root={"level": "INFO", "handlers": ["queue_listener"]},
-        formatters={
-            "standard": {"format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"}
-        },
-        log_exceptions="always",
-    ),
-    middleware=[config.session_config.middleware],
-    stores={"sessions": FileStore(path=config.STORE_PATH / "client_sessions")},
-    dependencies={
-        "trivia_db": litestar.di.Provide(get_open_trivia_db),
-        "session_manager": litestar.di.Provide(
-            session.GameSessionManager,
-            use_cache=True,
-            sync_to_thread=True,
+
+# Building the app does no I/O, every worker opens its own resources in on_startup.
+def create_app() -> litestar.Litestar:
+    return litestar.Litestar(
+        route_handlers=[
+            index,
+            room,
+            metrics_endpoint,
+            static.static_asset,
+            session.GameWebsocketListener,
+        ],
+        csrf_config=CSRFConfig(secret="test-secret"),
+        # Static assets are served precompressed.
+        compression_config=CompressionConfig(backend="gzip", exclude="/static"),
+        template_config=config.template_config,
+        logging_config=LoggingConfig(
+            root={"level": "INFO", "handlers": ["queue_listener"]},
+            formatters={
+                "standard": {"format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s"}
+            },
+            log_exceptions="always",
         ),
-        "player_session_id": litestar.di.Provide(utils.get_player_session_id),
-        "template_engine": litestar.di.Provide(utils.get_template_engine),
-    },
-    on_startup=[on_startup],
-    listeners=session.LISTENERS,
-    websocket_class=session.GameWebsocket,
-)
+        middleware=[config.session_config.middleware],
+        stores={"sessions": stores.create_client_session_store()},
+        dependencies={
+            "trivia_db": litestar.di.Provide(provide_trivia_db),
+            "question_bank": litestar.di.Provide(provide_question_bank),
+            "session_manager": litestar.di.Provide(provide_session_manager),
+            "player_session_id": litestar.di.Provide(utils.get_player_session_id),
+            "template_engine": litestar.di.Provide(utils.get_template_engine),
+        },
+        on_startup=[on_startup],
+        on_shutdown=[on_shutdown],
+        listeners=session.LISTENERS,
+        websocket_class=session.GameWebsocket,
+    )
+
+
+app = create_app()
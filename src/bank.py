@@ -0,0 +1,246 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+from pathlib import Path
+from typing import cast
+
+import config
+from api import Difficulty, OpenTriviaDB, OpenTriviaQuestion
+
+logger = logging.getLogger(__name__)
+
+# A (category, difficulty) filter as rooms draw with it, None matching any value.
+Bucket = tuple[str | None, str | None]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    hash TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    type TEXT NOT NULL,
+    text TEXT NOT NULL,
+    correct_answer TEXT NOT NULL,
+    incorrect_answers TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS questions_category_difficulty ON questions (category, difficulty);
+"""
+
+
+def get_question_hash(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+class QuestionBank:
+    def __init__(
+        self,
+        path: Path,
+        trivia_db: OpenTriviaDB,
+        low_watermark: int = config.QUESTION_BANK_LOW_WATERMARK,
+        batch_size: int = config.QUESTION_BANK_BATCH_SIZE,
+        refill_interval: float = config.QUESTION_BANK_REFILL_INTERVAL,
+        prefetch_threshold: int = config.QUESTION_BANK_PREFETCH_THRESHOLD,
+    ) -> None:
+        self.path = path
+        self.db = trivia_db
+        self.low_watermark = low_watermark
+        self.batch_size = batch_size
+        self.refill_interval = refill_interval
+        self.prefetch_threshold = prefetch_threshold
+        self.token_key = "bank"
+        self.connection: sqlite3.Connection | None = None
+        self.refill_task: asyncio.Task | None = None
+        self.refill_requested = asyncio.Event()
+        # Every bucket rooms have drawn from is kept above the low watermark on its own.
+        self.buckets: set[Bucket] = {(None, None)}
+        self.requested_buckets: set[Bucket] = set()
+
+    def open(self) -> None:
+        self.connection = sqlite3.connect(self.path, isolation_level=None)
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    @property
+    def db_connection(self) -> sqlite3.Connection:
+        if self.connection is None:
+            raise RuntimeError("Question bank is not open")
+
+        return self.connection
+
+    @staticmethod
+    def get_filters(
+        category: str | None, difficulty: str | None, after: int | None = None
+    ) -> tuple[str, list]:
+        clauses, params = [], []
+
+        if after is not None:
+            clauses.append("rowid > ?")
+            params.append(after)
+
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+
+        if difficulty is not None:
+            clauses.append("difficulty = ?")
+            params.append(difficulty)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def add(self, questions: list[OpenTriviaQuestion]) -> int:
+        before = self.db_connection.total_changes
+        self.db_connection.executemany(
+            "INSERT OR IGNORE INTO questions "
+            "(hash, category, difficulty, type, text, correct_answer, incorrect_answers) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    get_question_hash(question.text),
+                    question.category,
+                    question.difficulty,
+                    question.type,
+                    question.text,
+                    question.correct_answer,
+                    json.dumps(question.incorrect_answers),
+                )
+                for question in questions
+            ],
+        )
+        return self.db_connection.total_changes - before
+
+    def count(
+        self,
+        category: str | None = None,
+        difficulty: str | None = None,
+        after: int | None = None,
+    ) -> int:
+        where, params = self.get_filters(category, difficulty, after)
+        (count,) = self.db_connection.execute(
+            f"SELECT count(*) FROM questions {where}", params
+        ).fetchone()
+        return count
+
+    def random_cursor(self) -> int:
+        (last,) = self.db_connection.execute("SELECT max(rowid) FROM questions").fetchone()
+        return random.randrange(last) if last else 0
+
+    def next_after(
+        self, cursor: int, category: str | None = None, difficulty: str | None = None
+    ) -> tuple[int, OpenTriviaQuestion] | None:
+        where, params = self.get_filters(category, difficulty, after=cursor)
+        row = self.db_connection.execute(
+            "SELECT rowid, category, difficulty, type, text, correct_answer, incorrect_answers "
+            f"FROM questions {where} ORDER BY rowid LIMIT 1",
+            params,
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return row[0], self.question_from_row(row[1:])
+
+    def draw(
+        self, cursor: int, category: str | None = None, difficulty: str | None = None
+    ) -> tuple[int, OpenTriviaQuestion] | None:
+        drawn = self.next_after(cursor, category, difficulty)
+
+        if drawn is None:
+            # Ran past the newest question, start over rather than leave the game without one.
+            self.request_refill(category, difficulty)
+            return self.next_after(0, category, difficulty)
+
+        if self.count(category, difficulty, after=drawn[0]) < self.prefetch_threshold:
+            self.request_refill(category, difficulty)
+
+        return drawn
+
+    @staticmethod
+    def question_from_row(row: tuple) -> OpenTriviaQuestion:
+        category, difficulty, type_, text, correct_answer, incorrect_answers = row
+        # Stored text is already unescaped, so skip the API validators.
+        return OpenTriviaQuestion.model_construct(
+            category=category,
+            difficulty=difficulty,
+            type=type_,
+            text=text,
+            correct_answer=correct_answer,
+            incorrect_answers=json.loads(incorrect_answers),
+        )
+
+    async def refill(self, category: str | None = None, difficulty: str | None = None) -> int:
+        # OpenTDB filters categories by numeric id while the bank stores their names, so only
+        # the difficulty narrows the request; a category bucket fills from mixed batches.
+        questions = await self.db.get(
+            amount=self.batch_size,
+            difficulty=cast(Difficulty | None, difficulty),
+            token_key=self.token_key,
+        )
+        added = self.add(questions)
+        logger.info(
+            "Question bank refilled with %d new questions for %s/%s",
+            added,
+            category or "any",
+            difficulty or "any",
+        )
+        return added
+
+    def request_refill(self, category: str | None = None, difficulty: str | None = None) -> None:
+        self.buckets.add((category, difficulty))
+        self.requested_buckets.add((category, difficulty))
+        self.refill_requested.set()
+
+    async def run_refiller(self) -> None:
+        while True:
+            self.refill_requested.clear()
+            requested, self.requested_buckets = self.requested_buckets, set()
+
+            for category, difficulty in sorted(self.buckets, key=str):
+                try:
+                    if (category, difficulty) in requested or (
+                        self.count(category, difficulty) < self.low_watermark
+                    ):
+                        await self.refill(category, difficulty)
+                except Exception:
+                    logger.exception("Question bank refill failed")
+
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self.refill_requested.wait(), self.refill_interval)
+
+    def start_refilling(self) -> None:
+        if self.refill_task is None:
+            self.refill_task = asyncio.create_task(self.run_refiller())
+
+    async def stop_refilling(self) -> None:
+        if self.refill_task is not None:
+            self.refill_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.refill_task
+            self.refill_task = None
+
+
+_BANK: QuestionBank | None = None
+
+
+async def get_question_bank(trivia_db: OpenTriviaDB) -> QuestionBank:
+    global _BANK
+    if not _BANK:
+        _BANK = QuestionBank(config.QUESTION_BANK_PATH, trivia_db)
+        _BANK.open()
+
+    return _BANK
+
+
+async def close_question_bank() -> None:
+    global _BANK
+    if _BANK:
+        await _BANK.stop_refilling()
+        _BANK.close()
+        _BANK = None
@@ -0,0 +1,221 @@
+"""In-process multi-room load test.
+
+Opens ``--rooms`` rooms with ``--players`` websocket players each against the real app, plays
+``--rounds`` rounds of SetGuess/UnsetGuess traffic and writes latency, throughput, CPU and
+memory figures to a JSON file so runs can be compared between releases. OpenTDB is replaced by
+a stub serving generated questions, and all state lives in a temporary directory.
+
+Run from ``src``: ``python -m benchmarks.load --rooms 10 --players 20 --output load.json``
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import queue
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+import api
+import config
+from api import OpenTriviaDB, OpenTriviaQuestion
+
+ANSWERS_OPENING_TAG = '<div class="button-group" id="answers">'
+
+
+class StubTriviaDB(OpenTriviaDB):
+    def __init__(self) -> None:
+        super().__init__(base_url="http://stub.invalid", api_path="/api.php")
+        self.served = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def get(self, amount: int, *args, **kwargs) -> list[OpenTriviaQuestion]:
+        questions = []
+        for _ in range(amount):
+            self.served += 1
+            questions.append(
+                OpenTriviaQuestion.model_validate(
+                    {
+                        "type": "multiple",
+                        "category": "Benchmark",
+                        "difficulty": "easy",
+                        "question": f"Benchmark question #{self.served}?",
+                        "correct_answer": "Right",
+                        "incorrect_answers": ["Wrong A", "Wrong B", "Wrong C"],
+                    }
+                )
+            )
+        return questions
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def shows_guess(text: str, guess: str | None) -> bool:
+    # Only the player's own answers.html counts: question.html and revealed-answers.html carry
+    # an id="answers" block too, but they go to the whole room and have no ws-send forms.
+    if not text.lstrip().startswith(ANSWERS_OPENING_TAG) or "ws-send" not in text:
+        return False
+
+    if guess is None:
+        return "button primary" not in text
+
+    return f'class="button primary" id="button-{guess}"' in text
+
+
+def wait_for_answers(socket, guess: str | None, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    with contextlib.suppress(queue.Empty):
+        while time.monotonic() < deadline:
+            if shows_guess(socket.receive_text(timeout=deadline - time.monotonic()), guess):
+                return
+
+    raise TimeoutError(f"Did not receive the answers for guess {guess!r} in time")
+
+
+def drain(socket) -> None:
+    try:
+        while True:
+            socket.receive_text(block=False)
+    except Exception:
+        pass
+
+
+def wait_for_next_question(manager, question_ids: dict, timeout: float = 5.0) -> None:
+    # Guesses for a question the room has already moved past would never show as guessed.
+    deadline = (
+        time.monotonic() + config.REVEAL_ANSWERS_DELAY + config.NEXT_QUESTION_DELAY + timeout
+    )
+    while any(
+        manager.sessions[room_id].current_question.id == question_id
+        for room_id, question_id in question_ids.items()
+    ):
+        if time.monotonic() > deadline:
+            raise TimeoutError("Rooms did not move on to their next question in time")
+        time.sleep(0.01)
+
+
+def run(rooms: int, players: int, rounds: int, unset_ratio: float, seed: int) -> dict:
+    import session
+    from app import create_app
+    from litestar.testing import TestClient
+
+    rnd = random.Random(seed)
+    latencies: list[float] = []
+    events = 0
+
+    with TestClient(create_app()) as client, contextlib.ExitStack() as stack:
+        manager = session.state._Manager
+        assert manager is not None
+
+        room_ids = []
+        for _ in range(rooms):
+            response = client.get("/", follow_redirects=False)
+            room_ids.append(uuid.UUID(response.headers["location"].rsplit("/", 1)[-1]))
+
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+
+        sockets = {
+            room_id: [
+                stack.enter_context(
+                    client.websocket_connect(f"/game-session?game_session_id={room_id}")
+                )
+                for _ in range(players)
+            ]
+            for room_id in room_ids
+        }
+
+        for _ in range(rounds):
+            question_ids = {
+                room_id: manager.sessions[room_id].current_question.id for room_id in room_ids
+            }
+
+            for room_id, room_sockets in sockets.items():
+                answers = manager.sessions[room_id].current_question.answers
+
+                for socket in rnd.sample(room_sockets, len(room_sockets)):
+                    guess = rnd.choice(answers).id
+                    commands = [{"Command": "SetGuess", "Value": guess}]
+                    if rnd.random() < unset_ratio:
+                        commands += [{"Command": "UnsetGuess"}, commands[0]]
+
+                    for command in commands:
+                        # Room-wide fragments from earlier commands must not end the wait early.
+                        drain(socket)
+                        started = time.perf_counter()
+                        socket.send_json(command)
+                        wait_for_answers(socket, command.get("Value"))
+                        latencies.append(time.perf_counter() - started)
+                        events += 1
+
+            wait_for_next_question(manager, question_ids)
+
+        cpu_seconds = time.process_time() - cpu_started
+        wall_seconds = time.perf_counter() - wall_started
+        memory_after, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Let held back player list updates reach the sockets before they close.
+        time.sleep(max(config.BROADCAST_COALESCE_WINDOW, config.LARGE_ROOM_UPDATE_WINDOW))
+
+    return {
+        "rooms": rooms,
+        "players_per_room": players,
+        "rounds": rounds,
+        "events": events,
+        "events_per_second": events / wall_seconds,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        },
+        "cpu_seconds_per_room": cpu_seconds / rooms,
+        "memory_bytes_per_room": (memory_after - memory_before) / rooms,
+        "memory_peak_bytes": memory_peak,
+        "python": platform.python_version(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rooms", type=int, default=5)
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--unset-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("load-results.json"))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as store:
+        config.STORE_PATH = Path(store)
+        config.QUESTION_BANK_PATH = config.STORE_PATH / "questions.sqlite3"
+        config.TEMPLATE_CACHE_DIR = config.STORE_PATH / "template_cache"
+        config.BROADCAST_BUS = "memory"
+        # Long enough for a room's last player to take back and redo their guess before the
+        # reveal, afterwards the room can move on before their answers are rendered.
+        config.REVEAL_ANSWERS_DELAY = 0.5
+        config.NEXT_QUESTION_DELAY = 0.05
+        api._DB = StubTriviaDB()
+
+        results = run(args.rooms, args.players, args.rounds, args.unset_ratio, args.seed)
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
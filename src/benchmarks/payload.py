@@ -0,0 +1,137 @@
+"""Websocket bytes per room event: plain templates, compact templates and permessage-deflate.
+
+Every event goes through ``GameWebsocketListener.deliver`` against fake sockets, so the
+fragments and audiences match what the server sends. Deflate sizes use one raw-deflate stream
+per socket with context takeover, the way permessage-deflate compresses consecutive messages.
+
+Run from ``src``: ``python -m benchmarks.payload``
+
+Bytes per event across all sockets::
+
+    players  event                raw  compact  deflate     both
+    2        join                2766     2519      987      978
+    2        guess               2402     2247      425      413
+    2        reveal              2556     2298      576      543
+    2        next question      11068    10127      971      969
+    10       join               10825    10191     3615     3571
+    10       guess               3698     3543      625      614
+    10       reveal              9372     8426     2498     2410
+    10       next question      78995    73191     7139     6783
+    100      join               31011    30191    17918    17916
+    100      guess              37973    37818     6493     6486
+    100      reveal             86052    77366    24591    24472
+    100      next question    1348032  1250404   119471   118201
+"""
+
+import asyncio
+import zlib
+from typing import cast
+
+import config
+import session.websocket as websocket
+from session.bus import Audience, BroadcastMessage
+from session.state import GameSession, Player
+from session.websocket import GameWebsocket, GameWebsocketListener
+
+from benchmarks.serialization import make_session
+
+ROOM_SIZES = (2, 10, 100)
+
+
+class FakeSocket:
+    def __init__(self, player_session_id: str) -> None:
+        self.player_session_id = player_session_id
+        self.sent = 0
+        self.deflated = 0
+        self.compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+
+    def enqueue(self, key: str, text: str) -> None:
+        data = text.encode()
+        self.sent += len(data)
+        # permessage-deflate drops the trailing 0x00 0x00 0xff 0xff of every sync flush.
+        compressed = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.deflated += len(compressed) - 4
+
+
+def use_compact_templates(compact: bool) -> None:
+    config.COMPACT_TEMPLATES = compact
+    environment = config.template_config.engine_instance.engine
+    environment.trim_blocks = environment.lstrip_blocks = compact
+    environment.bytecode_cache = None
+    if environment.cache is not None:
+        environment.cache.clear()
+    websocket._TEMPLATES.clear()
+
+
+def room_events(session: GameSession) -> list[tuple[str, BroadcastMessage]]:
+    joined = Player.new("player-joined")
+    session.add_player(joined)
+    session.activate_player(joined.session_id)
+    guesser = session.players[0]
+    session.set_player_guess(guesser.session_id, session.current_question.answers[0].id)
+    summary = "players-summary.html" if session.large_room else None
+    # Large rooms send everyone the counts, the guesser is on the first page so its status too.
+    joined_audience = "all" if summary else "others"
+
+    def message(template_name: str, player: Player | None = None, audience: Audience = "all"):
+        player_session_id = player.session_id if player else None
+        return BroadcastMessage(
+            template_name=template_name,
+            game_session=session,
+            player_session_id=player_session_id,
+            audience=audience,
+        )
+
+    return [
+        ("join", message("players.html", joined, "player")),
+        ("join", message(summary or "player-joined.html", joined, joined_audience)),
+        ("guess", message("player-status.html", guesser)),
+        *([("guess", message(summary, guesser))] if summary else []),
+        ("guess", message("answers.html", guesser, "player")),
+        ("reveal", message("revealed-answers.html")),
+        ("next question", message("question.html")),
+        ("next question", message("players.html")),
+    ]
+
+
+async def measure(players: int, compact: bool) -> dict[str, tuple[int, int]]:
+    use_compact_templates(compact)
+    session = make_session(players)
+    for player in session.players:
+        session.activate_player(player.session_id)
+
+    sockets = [FakeSocket(player.session_id) for player in session.players]
+    sockets.append(FakeSocket("player-joined"))
+    GameWebsocketListener.sockets[session.id] = cast(list[GameWebsocket], sockets)
+
+    totals: dict[str, tuple[int, int]] = {}
+    for event, message in room_events(session):
+        sent = sum(socket.sent for socket in sockets)
+        deflated = sum(socket.deflated for socket in sockets)
+        await GameWebsocketListener.deliver(message)
+
+        before = totals.get(event, (0, 0))
+        totals[event] = (
+            before[0] + sum(socket.sent for socket in sockets) - sent,
+            before[1] + sum(socket.deflated for socket in sockets) - deflated,
+        )
+
+    del GameWebsocketListener.sockets[session.id]
+    return totals
+
+
+async def main() -> None:
+    for players in ROOM_SIZES:
+        plain = await measure(players, compact=False)
+        compact = await measure(players, compact=True)
+        print(f"{players} players, bytes per event across all sockets")
+        for event, (raw, deflated) in plain.items():
+            compact_raw, compact_deflated = compact[event]
+            print(
+                f"  {event:<14} raw {raw:>8}  compact {compact_raw:>8}"
+                f"  deflate {deflated:>7}  compact+deflate {compact_deflated:>7}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
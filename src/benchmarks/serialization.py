@@ -0,0 +1,54 @@
+"""Compare the pydantic JSON and msgspec MessagePack session persistence paths.
+
+Run from ``src``: ``python -m benchmarks.serialization``
+"""
+
+import timeit
+
+from session.codec import decode_session, encode_session
+from session.state import GameQuestion, GameSession, Player
+
+ROOM_SIZES = (2, 10, 100)
+ROUNDS = 2000
+
+
+def make_session(players: int) -> GameSession:
+    question = GameQuestion(
+        id="benchmark",
+        text="Which planet is known as the Red Planet?",
+        correct_answer="Mars",
+        incorrect_answers=["Venus", "Jupiter", "Mercury"],
+    )
+    return GameSession(
+        current_question=question,
+        players=[Player.new(f"player-{index:04}") for index in range(players)],
+    )
+
+
+def measure(label: str, encode, decode, session: GameSession) -> None:
+    raw = encode(session)
+    encode_us = timeit.timeit(lambda: encode(session), number=ROUNDS) / ROUNDS * 1e6
+    decode_us = timeit.timeit(lambda: decode(raw), number=ROUNDS) / ROUNDS * 1e6
+    print(f"  {label:<8} {len(raw):>8} B  encode {encode_us:8.1f} us  decode {decode_us:8.1f} us")
+
+
+def main() -> None:
+    for size in ROOM_SIZES:
+        session = make_session(size)
+        print(f"{size} players")
+        measure(
+            "json",
+            lambda s: s.model_dump_json().encode(),
+            GameSession.model_validate_json,
+            session,
+        )
+        measure(
+            "msgpack",
+            encode_session,
+            lambda raw: GameSession.model_validate(decode_session(raw)),
+            session,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Cold start time of a worker: importing the app, building it, and serving its first request.
+
+Each run uses a fresh interpreter. The import and factory phases are timed inside it, then a
+uvicorn worker is started with the app factory and ``/metrics`` is polled until it answers.
+Exits non-zero when the median time to the first response goes over ``--budget`` seconds.
+
+Run from ``src``: ``python -m benchmarks.startup --runs 5 --budget 2.0``
+"""
+
+import argparse
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+built = time.perf_counter()
+print(json.dumps({"import": imported - started, "create_app": built - imported}))
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import() -> dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], capture_output=True, check=True, text=True
+    )
+    return json.loads(output.stdout.splitlines()[-1])
+
+
+def measure_first_response(timeout: float) -> float:
+    port = free_port()
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "--factory",
+            "app:create_app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    )
+
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1):
+                    return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+
+        raise TimeoutError(f"worker did not answer within {timeout}s")
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    responses = [measure_first_response(args.timeout) for _ in range(args.runs)]
+
+    for phase in ("import", "create_app"):
+        median = statistics.median(run[phase] for run in imports)
+        print(f"{phase:<16} median {median * 1000:8.1f} ms")
+
+    first_response = statistics.median(responses)
+    print(f"{'first response':<16} median {first_response * 1000:8.1f} ms")
+    print(f"{'budget':<16}        {args.budget * 1000:8.1f} ms")
+
+    if first_response > args.budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
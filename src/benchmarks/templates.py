@@ -0,0 +1,54 @@
+"""Per-template render cost: lookup + full model_dump versus cached template + live models.
+
+Run from ``src``: ``python -m benchmarks.templates``
+
+Per render with a ten player room (CPython 3.11)::
+
+    players.html             before    620.5 us  after    357.9 us
+    player.html              before    184.7 us  after     65.7 us
+    player-status.html       before    180.3 us  after     42.9 us
+    question.html            before    289.5 us  after    143.3 us
+    answers.html             before    293.3 us  after    175.0 us
+    revealed-answers.html    before    307.7 us  after    129.2 us
+"""
+
+import timeit
+
+import config
+from session.websocket import ClientData, get_template, load_templates
+
+from benchmarks.serialization import make_session
+
+TEMPLATES = (
+    "players.html",
+    "player.html",
+    "player-status.html",
+    "question.html",
+    "answers.html",
+    "revealed-answers.html",
+)
+ROUNDS = 500
+
+
+def main() -> None:
+    session = make_session(10)
+    player = session.players[0]
+    data = ClientData(player_session_id=player.session_id, game_session=session)
+    load_templates()
+
+    for name in TEMPLATES:
+
+        def before(name=name):
+            template = config.template_config.engine_instance.get_template(name)
+            return template.render({**data.model_dump(), "player": player.model_dump()})
+
+        def after(name=name):
+            return get_template(name).render({**data.as_context(), "player": player})
+
+        before_us = timeit.timeit(before, number=ROUNDS) / ROUNDS * 1e6
+        after_us = timeit.timeit(after, number=ROUNDS) / ROUNDS * 1e6
+        print(f"{name:<24} before {before_us:8.1f} us  after {after_us:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 
+import os
 from pathlib import Path
 
+import jinja2
 from litestar.contrib.jinja import JinjaTemplateEngine
 from litestar.middleware.session.server_side import ServerSideSessionConfig
 from litestar.template.config import TemplateConfig
@@ -9,10 +11,89 @@ CWD = Path(__file__).parent
 ASSETS_DIR = CWD / "assets"
 AVATARS_DIR = ASSETS_DIR / "avatars"
 STORE_PATH = CWD / "store"
+TEMPLATES_DIR = CWD / "templates"
+TEMPLATE_CACHE_DIR = STORE_PATH / "template_cache"
+
+GAME_SESSION_FLUSH_DELAY = 1.0
+GAME_SESSION_ACTOR_IDLE_TIMEOUT = 60.0
+# Stored sessions expire this many seconds after their last write.
+GAME_SESSION_TTL = 24 * 60 * 60
+ROOM_IDLE_TIMEOUT = 60 * 60.0
+ROOM_SWEEP_INTERVAL = 5 * 60.0
+
+QUESTION_BANK_PATH = STORE_PATH / "questions.sqlite3"
+QUESTION_BANK_LOW_WATERMARK = 200
+QUESTION_BANK_BATCH_SIZE = 50
+QUESTION_BANK_REFILL_INTERVAL = 30.0
+QUESTION_BANK_PREFETCH_THRESHOLD = 20
+QUESTION_DRAW_ATTEMPTS = 50
+
+LARGE_ROOM_THRESHOLD = 50
+LARGE_ROOM_PAGE_SIZE = 24
+LARGE_ROOM_UPDATE_WINDOW = 0.5
+# Broadcasts to a room within this many seconds are coalesced, 0 sends them right away.
+BROADCAST_COALESCE_WINDOW = float(os.environ.get("TRIVIAMX_BROADCAST_COALESCE_WINDOW", 0.05))
+
+# Distinct fragments a socket may have queued before it is considered too far behind.
+SOCKET_OUTBOX_SIZE = 32
+SOCKET_SEND_TIMEOUT = 10.0
+
+# Websockets are compressed with permessage-deflate, which uvicorn negotiates by default. It is
+# a server-wide setting, /game-session being the only websocket route: run uvicorn with
+# --ws-per-message-deflate false (UVICORN_WS_PER_MESSAGE_DEFLATE=false) to turn it off.
+# Trim template blocks and collapse the indentation between tags of rendered fragments.
+COMPACT_TEMPLATES = os.environ.get("TRIVIAMX_COMPACT_TEMPLATES", "0") == "1"
+
+# A dropped player keeps their seat this many seconds, reconnecting within it only replays the
+# fragments they missed. 0 marks them inactive right away.
+RECONNECT_GRACE = float(os.environ.get("TRIVIAMX_RECONNECT_GRACE", 10.0))
+# Broadcasts remembered per room for replaying to reconnecting clients.
+ROOM_JOURNAL_SIZE = 64
+
+REVEAL_ANSWERS_DELAY = 5.0
+NEXT_QUESTION_DELAY = 5.0
+# A round whose worker is this many seconds past its next step is taken over by the next guess.
+ROUND_TIMER_TAKEOVER = 30.0
+
+CLIENT_SESSION_CACHE_SIZE = 10_000
+# Also keep client sessions on disk behind the in-memory cache, so they outlive restarts.
+CLIENT_SESSION_PERSIST = os.environ.get("TRIVIAMX_CLIENT_SESSION_PERSIST", "0") == "1"
+
+# "memory" keeps broadcasts within one process, "unix" relays them between workers.
+BROADCAST_BUS = os.environ.get("TRIVIAMX_BROADCAST_BUS", "memory")
+BROADCAST_BUS_PATH = Path(
+    os.environ.get("TRIVIAMX_BROADCAST_BUS_PATH", STORE_PATH / "broadcast.sock")
+)
+# With several workers every room command runs under a file lock against the stored session
+# and is written through, instead of trusting each worker's cached copy.
+GAME_SESSION_WRITE_THROUGH = BROADCAST_BUS != "memory"
+# Each worker's cache would only hold the client sessions it created itself, so with several
+# workers client sessions are read from and written to the shared FileStore directly.
+CLIENT_SESSION_CACHE = BROADCAST_BUS == "memory"
+
+
+def configure_template_engine(engine: JinjaTemplateEngine) -> None:
+    engine.engine.trim_blocks = engine.engine.lstrip_blocks = COMPACT_TEMPLATES
+
+    from static import static_url
+
+    engine.engine.globals["static_url"] = static_url
+
 
 template_config = TemplateConfig(
-    directory=CWD / "templates",
+    directory=TEMPLATES_DIR,
     engine=JinjaTemplateEngine,
+    engine_callback=configure_template_engine,
 )
 session_config = ServerSideSessionConfig()
 
+
+def attach_template_bytecode_cache() -> None:
+    # Reuse compiled template bytecode across restarts to speed up cold starts. Creating the
+    # directory is I/O, so it happens on startup rather than when the engine is built.
+    # Compact templates compile differently, so they get their own bytecode.
+    cache_dir = TEMPLATE_CACHE_DIR / "compact" if COMPACT_TEMPLATES else TEMPLATE_CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    engine = template_config.engine_instance.engine
+    engine.bytecode_cache = jinja2.FileSystemBytecodeCache(str(cache_dir))
+
@@ -0,0 +1,182 @@
+import bisect
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+# Minimal Prometheus text-format metrics. Recording is a dict lookup plus a few additions, so
+# the instrumentation can stay on in production.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return f"{{{pairs}}}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, label: str | None = None) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.values: dict[str, float] = {}
+
+    def inc(self, amount: float = 1, label: str = "") -> None:
+        self.values[label] = self.values.get(label, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for label, value in self.values.items():
+            labels = {self.label: label} if self.label else {}
+            yield f"{self.name}{format_labels(labels)} {value}"
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        yield f"{self.name} {self.callback()}"
+
+
+class CounterFunc(Gauge):
+    type = "counter"
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label: str | None = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = buckets
+        # label -> [per-bucket counts..., +Inf count, sum]
+        self.values: dict[str, list[float]] = {}
+
+    def observe(self, value: float, label: str = "") -> None:
+        counts = self.values.get(label)
+        if counts is None:
+            counts = self.values[label] = [0] * (len(self.buckets) + 2)
+
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, label: str = "") -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, label)
+
+    def samples(self) -> Iterator[str]:
+        for label, counts in self.values.items():
+            labels = {self.label: label} if self.label else {}
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts[:-1], strict=True):
+                cumulative += count
+                bucket_labels = format_labels({**labels, "le": str(bound)})
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{format_labels(labels)} {counts[-1]}"
+            yield f"{self.name}_count{format_labels(labels)} {cumulative}"
+
+
+Metric = TypeVar("Metric", Counter, Gauge, Histogram)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, label: str | None = None) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, label))
+
+
+def histogram(name: str, documentation: str, label: str | None = None) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, label))
+
+
+def gauge(name: str, documentation: str, callback: Callable[[], float]) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, callback))
+
+
+def counter_func(name: str, documentation: str, callback: Callable[[], float]) -> Gauge:
+    return REGISTRY.register(CounterFunc(name, documentation, callback))
+
+
+STORE_READ_SECONDS = histogram(
+    "triviamx_store_read_seconds", "Time spent loading game sessions from the store."
+)
+STORE_WRITE_SECONDS = histogram(
+    "triviamx_store_write_seconds", "Time spent writing game sessions to the store."
+)
+SESSION_CACHE_MISSES = counter(
+    "triviamx_session_cache_misses_total", "Game session lookups that had to read the store."
+)
+OPENTDB_REQUEST_SECONDS = histogram(
+    "triviamx_opentdb_get_seconds", "Duration of OpenTriviaDB.get calls, retries included."
+)
+OPENTDB_ERRORS = counter("triviamx_opentdb_errors_total", "Failed OpenTriviaDB.get calls.")
+TEMPLATE_RENDER_SECONDS = histogram(
+    "triviamx_template_render_seconds", "Template render time.", label="template"
+)
+SOCKET_SEND_SECONDS = histogram(
+    "triviamx_socket_send_seconds", "Per-socket websocket send latency during broadcasts."
+)
+SOCKET_SEND_ERRORS = counter(
+    "triviamx_socket_send_errors_total", "Websocket sends that failed during broadcasts."
+)
+SOCKET_FRAGMENTS_SUPERSEDED = counter(
+    "triviamx_socket_fragments_superseded_total",
+    "Queued fragments dropped because a newer one for the same target arrived.",
+)
+SOCKET_SLOW_DISCONNECTS = counter(
+    "triviamx_socket_slow_disconnects_total",
+    "Clients disconnected for falling too far behind.",
+    label="reason",
+)
+CLIENT_SESSION_LOOKUPS = counter(
+    "triviamx_client_session_lookups_total",
+    "Client session lookups served by the in-memory cache.",
+    label="result",
+)
+CLIENT_SESSION_EVICTIONS = counter(
+    "triviamx_client_session_evictions_total",
+    "Client sessions evicted from the in-memory cache to stay within its size.",
+)
+TIMER_EVENTS = counter(
+    "triviamx_timer_events_total", "Round timer scheduler activity.", label="event"
+)
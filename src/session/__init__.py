@@ -1,3 +1,11 @@
+from .bus import (
+    BroadcastBus,
+    BroadcastMessage,
+    UnixSocketBus,
+    close_broadcast_bus,
+    get_broadcast_bus,
+)
+from .debounce import BroadcastDebouncer
 from .state import (
     GameAnswerEntry,
     GameQuestion,
@@ -5,25 +13,50 @@ from .state import (
     GameSessionManager,
     GameState,
     Player,
+    close_game_session_manager,
     get_game_session_manager,
 )
+from .sweeper import RoomSweeper, get_room_sweeper, stop_room_sweeper
+from .timers import TimerScheduler, close_timer_scheduler, get_timer_scheduler
 from .websocket import (
     LISTENERS,
     ClientData,
     GameWebsocket,
     GameWebsocketListener,
+    close_broadcast_debouncer,
+    get_broadcast_debouncer,
+    load_templates,
+    render_template,
     update_answers_after_guess,
     update_player_status_after_guess,
     update_players_after_join,
+    update_players_after_leave,
 )
 
 __all__ = [
+    "BroadcastBus",
+    "BroadcastMessage",
+    "UnixSocketBus",
+    "get_broadcast_bus",
+    "close_broadcast_bus",
+    "BroadcastDebouncer",
+    "get_broadcast_debouncer",
+    "close_broadcast_debouncer",
+    "RoomSweeper",
+    "get_room_sweeper",
+    "stop_room_sweeper",
+    "TimerScheduler",
+    "get_timer_scheduler",
+    "close_timer_scheduler",
     "ClientData",
     "GameWebsocketListener",
     "update_players_after_join",
+    "update_players_after_leave",
     "update_answers_after_guess",
     "update_player_status_after_guess",
     "LISTENERS",
+    "load_templates",
+    "render_template",
     "GameWebsocket",
     "GameAnswerEntry",
     "GameQuestion",
@@ -32,4 +65,5 @@ __all__ = [
     "GameSession",
     "GameSessionManager",
     "get_game_session_manager",
+    "close_game_session_manager",
 ]
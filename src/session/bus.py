@@ -0,0 +1,224 @@
+import asyncio
+import contextlib
+import fcntl
+import logging
+import struct
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Literal
+
+import config
+import pydantic
+
+import session.state as state
+from session.codec import decode_broadcast, encode_broadcast
+
+logger = logging.getLogger(__name__)
+
+
+# Who in the room receives a message, relative to the player it is about.
+Audience = Literal["all", "player", "others"]
+
+
+class BroadcastMessage(pydantic.BaseModel):
+    template_name: str
+    game_session: state.GameSession
+    player_session_id: str | None = None
+    audience: Audience = "all"
+
+
+BroadcastHandler = Callable[[BroadcastMessage], Awaitable[None]]
+
+
+# Delivers room broadcasts to the sockets held by this process only.
+class BroadcastBus:
+    def __init__(self) -> None:
+        self.handlers: list[BroadcastHandler] = []
+        self.remote_handlers: list[BroadcastHandler] = []
+
+    def subscribe(self, handler: BroadcastHandler, remote_only: bool = False) -> None:
+        if remote_only:
+            self.remote_handlers.append(handler)
+        else:
+            self.handlers.append(handler)
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def publish(self, message: BroadcastMessage) -> None:
+        await self.deliver(message)
+
+    async def deliver(self, message: BroadcastMessage) -> None:
+        for handler in self.handlers:
+            await handler(message)
+
+
+# Relays room broadcasts between workers through a local Unix socket broker. The first worker
+# to take the lock file runs the broker and every worker, the broker's own included, connects to
+# it. Messages are delivered locally right away and forwarded to the other workers, each one a
+# length-prefixed frame holding the message in the session codec.
+class UnixSocketBus(BroadcastBus):
+    reconnect_delay = 1.0
+    # Frames announcing more than this are treated as a broken connection.
+    read_limit = 2**24
+    frame_header = struct.Struct("!I")
+
+    def __init__(self, path: Path) -> None:
+        super().__init__()
+        self.path = path
+        self.lock_path = path.with_suffix(".lock")
+        self.lock_file = None
+        self.server: asyncio.Server | None = None
+        self.peers: set[asyncio.StreamWriter] = set()
+        self.peer_tasks: set[asyncio.Task] = set()
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.reader_task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        await self.connect()
+        self.reader_task = asyncio.create_task(self.read_forever())
+
+    async def close(self) -> None:
+        if self.reader_task is not None:
+            self.reader_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.reader_task
+
+        if self.writer is not None:
+            self.writer.close()
+
+        if self.server is not None:
+            self.server.close()
+            for peer in self.peers:
+                peer.close()
+            # Closed peers wake their handlers with end of file, let them finish first.
+            await asyncio.gather(*self.peer_tasks, return_exceptions=True)
+            self.path.unlink(missing_ok=True)
+
+        if self.lock_file is not None:
+            self.lock_file.close()
+
+    async def publish(self, message: BroadcastMessage) -> None:
+        await self.deliver(message)
+
+        if self.writer is None:
+            return
+
+        try:
+            self.writer.write(self.frame(encode_broadcast(message)))
+            await self.writer.drain()
+        except ConnectionError:
+            logger.warning("Lost connection to the broadcast broker")
+
+    def frame(self, payload: bytes) -> bytes:
+        return self.frame_header.pack(len(payload)) + payload
+
+    async def read_frame(self, reader: asyncio.StreamReader) -> bytes | None:
+        try:
+            header = await reader.readexactly(self.frame_header.size)
+            (size,) = self.frame_header.unpack(header)
+            if size > self.read_limit:
+                logger.warning("Dropping a broadcast connection announcing a %d byte frame", size)
+                return None
+            return await reader.readexactly(size)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+
+    def try_become_broker(self) -> bool:
+        if self.lock_file is None:
+            self.lock_file = self.lock_path.open("w")
+
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        return True
+
+    async def connect(self) -> None:
+        while True:
+            # The old broker may still hold the lock when its connection drops, so keep trying.
+            if self.server is None and self.try_become_broker():
+                self.server = await asyncio.start_unix_server(self.handle_peer, path=self.path)
+
+            try:
+                self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def read_forever(self) -> None:
+        while True:
+            payload = await self.read_frame(self.reader) if self.reader else None
+
+            if payload is None:
+                # The broker went away, one of the remaining workers takes over.
+                self.writer = None
+                await self.connect()
+                continue
+
+            try:
+                message = BroadcastMessage.model_validate(decode_broadcast(payload))
+                for handler in self.remote_handlers:
+                    await handler(message)
+                await self.deliver(message)
+            except Exception:
+                logger.exception("Failed to deliver a relayed broadcast")
+
+    async def handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # A connection accepted just before close() would otherwise outlive the broker, leaving
+        # that worker attached to nothing instead of taking over.
+        if self.server is None or not self.server.is_serving():
+            writer.close()
+            return
+
+        self.peers.add(writer)
+        task = asyncio.current_task()
+        if task is not None:
+            self.peer_tasks.add(task)
+
+        try:
+            while (payload := await self.read_frame(reader)) is not None:
+                frame = self.frame(payload)
+                peers = [peer for peer in self.peers if peer is not writer]
+                for peer in peers:
+                    peer.write(frame)
+
+                # Waiting for every peer to take the frame bounds their buffers; a slow worker
+                # slows down the publisher instead of growing the broker's memory.
+                results = await asyncio.gather(
+                    *(peer.drain() for peer in peers), return_exceptions=True
+                )
+                for peer, result in zip(peers, results, strict=True):
+                    if isinstance(result, Exception):
+                        self.peers.discard(peer)
+                        peer.close()
+        finally:
+            self.peers.discard(writer)
+            self.peer_tasks.discard(task)
+            writer.close()
+
+
+_BUS: BroadcastBus | None = None
+
+
+def get_broadcast_bus() -> BroadcastBus:
+    global _BUS
+    if _BUS is None:
+        if config.BROADCAST_BUS == "unix":
+            _BUS = UnixSocketBus(config.BROADCAST_BUS_PATH)
+        else:
+            _BUS = BroadcastBus()
+
+    return _BUS
+
+
+async def close_broadcast_bus() -> None:
+    global _BUS
+    if _BUS:
+        await _BUS.close()
+        _BUS = None
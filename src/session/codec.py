@@ -0,0 +1,153 @@
+import datetime
+import uuid
+from typing import Any
+
+import msgspec
+
+# Compact MessagePack persistence for game sessions. Records mirror the stored (non-computed)
+# fields of the pydantic models as positional arrays and are wrapped in a (version, record)
+# envelope, so the layout can change later without breaking sessions already on disk.
+
+SCHEMA_VERSION = 4
+
+
+class AvatarRecord(msgspec.Struct, array_like=True):
+    name: str
+    url: str
+
+
+class PlayerRecord(msgspec.Struct, array_like=True):
+    session_id: str
+    nickname: str
+    avatar: AvatarRecord
+    current_guess: str | None
+    active: bool
+    # Missing from players stored before it was added.
+    joins: int = 0
+
+
+class AnswerRecord(msgspec.Struct, array_like=True):
+    id: str
+    text: str
+
+
+class QuestionRecord(msgspec.Struct, array_like=True):
+    id: str
+    text: str
+    correct_answer: str
+    incorrect_answers: list[str]
+    guess: str | None
+    get_at: datetime.datetime
+    answers: list[AnswerRecord]
+
+
+class SessionRecordV1(msgspec.Struct, array_like=True):
+    id: uuid.UUID
+    current_question: QuestionRecord
+    question_cursor: int
+    question_category: str | None
+    question_difficulty: str | None
+    started: datetime.datetime
+    answers_url: str
+    players: list[PlayerRecord]
+    timer: int
+
+
+class SessionRecordV2(SessionRecordV1, array_like=True):
+    seen_questions: set[str]
+
+
+class SessionRecordV3(SessionRecordV2, array_like=True):
+    version: int
+
+
+class SessionRecord(SessionRecordV3, array_like=True):
+    round_timer: str | None
+    round_due: float | None
+    answers_revealed: bool
+
+
+# Room broadcasts relayed between workers; the session rides along in its own versioned envelope.
+class BroadcastRecord(msgspec.Struct, array_like=True):
+    template_name: str
+    player_session_id: str | None
+    audience: str
+    game_session: msgspec.Raw
+
+
+_encoder = msgspec.msgpack.Encoder()
+_envelope_decoder = msgspec.msgpack.Decoder(tuple[int, msgspec.Raw])
+# Older versions decode into their own record, fields added since then fall back to defaults.
+_record_decoders = {
+    1: msgspec.msgpack.Decoder(SessionRecordV1),
+    2: msgspec.msgpack.Decoder(SessionRecordV2),
+    3: msgspec.msgpack.Decoder(SessionRecordV3),
+    4: msgspec.msgpack.Decoder(SessionRecord),
+}
+_broadcast_decoder = msgspec.msgpack.Decoder(BroadcastRecord)
+
+
+def encode_session(session: Any) -> bytes:
+    record = msgspec.convert(session, SessionRecord, from_attributes=True)
+    return _encoder.encode((SCHEMA_VERSION, record))
+
+
+def is_legacy(raw: bytes) -> bool:
+    # Sessions written before the binary format are pydantic JSON documents.
+    return raw[:1] == b"{"
+
+
+# Fields holding nested records; to_builtins would turn array-like records into plain lists.
+_NESTED_FIELDS: dict[type, tuple[str, ...]] = {
+    PlayerRecord: ("avatar",),
+    QuestionRecord: ("answers",),
+    SessionRecordV1: ("current_question", "players"),
+    SessionRecordV2: ("current_question", "players"),
+    SessionRecordV3: ("current_question", "players"),
+    SessionRecord: ("current_question", "players"),
+}
+
+
+def as_dict(record: msgspec.Struct) -> dict:
+    data = msgspec.structs.asdict(record)
+
+    for field in _NESTED_FIELDS.get(type(record), ()):
+        value = data[field]
+        if isinstance(value, list):
+            data[field] = [as_dict(item) for item in value]
+        else:
+            data[field] = as_dict(value)
+
+    return data
+
+
+def decode_session(raw: bytes) -> dict:
+    if is_legacy(raw):
+        return msgspec.json.decode(raw)
+
+    version, body = _envelope_decoder.decode(raw)
+    decoder = _record_decoders.get(version)
+    if decoder is None:
+        raise ValueError(f"Unsupported game session schema version {version}")
+
+    return as_dict(decoder.decode(body))
+
+
+def encode_broadcast(message: Any) -> bytes:
+    record = BroadcastRecord(
+        template_name=message.template_name,
+        player_session_id=message.player_session_id,
+        audience=message.audience,
+        game_session=msgspec.Raw(encode_session(message.game_session)),
+    )
+    return _encoder.encode(record)
+
+
+def decode_broadcast(raw: bytes) -> dict:
+    record = _broadcast_decoder.decode(raw)
+    return {
+        "template_name": record.template_name,
+        "player_session_id": record.player_session_id,
+        "audience": record.audience,
+        "game_session": decode_session(bytes(record.game_session)),
+    }
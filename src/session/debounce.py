@@ -0,0 +1,100 @@
+import asyncio
+import uuid
+from collections.abc import Awaitable, Callable
+
+from session.bus import BroadcastMessage
+from session.timers import TimerScheduler
+
+MessageKey = tuple[str, str | None, str]
+
+DebounceTimer = "broadcast-debounce"
+
+
+# Holds a room's broadcasts for a short window and publishes them together. Repeated messages
+# for the same template and audience collapse into one, and a burst of per-player deltas
+# collapses into a single full render of the template they patch. Every message is rendered
+# from the newest session state seen during the window.
+class BroadcastDebouncer:
+    def __init__(
+        self,
+        scheduler: TimerScheduler,
+        publish: Callable[[BroadcastMessage], Awaitable[None]],
+        collapse_into: dict[str, str],
+    ) -> None:
+        self.scheduler = scheduler
+        self.publish = publish
+        self.collapse_into = collapse_into
+        self.pending: dict[uuid.UUID, dict[MessageKey, BroadcastMessage]] = {}
+        self.submitted = 0
+        self.published = 0
+
+    async def submit(self, message: BroadcastMessage, window: float) -> None:
+        self.submitted += 1
+
+        if window <= 0:
+            self.published += 1
+            await self.publish(message)
+            return
+
+        session_id = message.game_session.id
+        pending = self.pending.get(session_id)
+
+        if pending is None:
+            pending = self.pending[session_id] = {}
+            self.scheduler.schedule(
+                (session_id, DebounceTimer), window, lambda: self.flush(session_id)
+            )
+
+        key = (message.template_name, message.player_session_id, message.audience)
+        pending.pop(key, None)
+        pending[key] = message
+
+    def collapse(self, messages: list[BroadcastMessage]) -> list[BroadcastMessage]:
+        for full_template in dict.fromkeys(self.collapse_into.values()):
+            deltas = [
+                m for m in messages if self.collapse_into.get(m.template_name) == full_template
+            ]
+            has_full = any(
+                m.template_name == full_template and m.audience == "all" for m in messages
+            )
+
+            # Deltas in a large room only cover its first page, resending the whole page for them
+            # would cost every socket more than the deltas do.
+            if len(deltas) > 1 and not has_full and not deltas[-1].game_session.large_room:
+                messages.append(
+                    BroadcastMessage(
+                        template_name=full_template, game_session=deltas[-1].game_session
+                    )
+                )
+                has_full = True
+
+            if has_full:
+                # A full render for the whole room makes the deltas and personal copies redundant.
+                messages = [
+                    m
+                    for m in messages
+                    if self.collapse_into.get(m.template_name) != full_template
+                    and (m.template_name != full_template or m.audience == "all")
+                ]
+
+        return messages
+
+    async def flush(self, session_id: uuid.UUID) -> None:
+        pending = self.pending.pop(session_id, None)
+        if not pending:
+            return
+
+        messages = self.collapse(list(pending.values()))
+        latest = list(pending.values())[-1].game_session
+        self.published += len(messages)
+
+        await asyncio.gather(
+            *(
+                self.publish(message.model_copy(update={"game_session": latest}))
+                for message in messages
+            )
+        )
+
+    def forget(self, session_id: uuid.UUID) -> None:
+        self.pending.pop(session_id, None)
+        self.scheduler.cancel((session_id, DebounceTimer))
@@ -1,21 +1,30 @@
+import asyncio
+import contextlib
 import datetime
+import fcntl
 import hashlib
+import itertools
 import random
+import time
 import uuid
+from typing import Callable
 
 import config
 import litestar
 import litestar.stores
 import litestar.stores.file
+import metrics
 import pydantic
 import utils
-from api import OpenTriviaDB
+from api import OpenTriviaDB, OpenTriviaQuestion
+from bank import QuestionBank, get_question_hash
+
+from session.codec import decode_session, encode_session, is_legacy
 
 
 class GameAnswerEntry(pydantic.BaseModel):
     id: str
     text: str
-    button_class: str
 
 
 class GameQuestion(pydantic.BaseModel):
@@ -25,21 +34,31 @@ class GameQuestion(pydantic.BaseModel):
     incorrect_answers: list[str]
     guess: str | None = None
     get_at: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
+    answers: list[GameAnswerEntry] = pydantic.Field(default_factory=list)
 
-    @pydantic.computed_field
-    @property
-    def answers(self) -> list[GameAnswerEntry]:
-        rnd = random.Random(self.text)
-        answers = self.incorrect_answers + [self.correct_answer]
-        rnd.shuffle(answers)
-        return [
-            GameAnswerEntry(
-                id=hashlib.md5(ans.encode()).hexdigest(),
-                text=ans,
-                button_class=self.get_button_class(ans),
-            )
-            for ans in answers
-        ]
+    _answers_by_id: dict[str, GameAnswerEntry] = pydantic.PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context) -> None:
+        # Shuffle and hash the answers once; stored questions keep the order they were created in.
+        if not self.answers:
+            rnd = random.Random(self.text)
+            answers = self.incorrect_answers + [self.correct_answer]
+            rnd.shuffle(answers)
+            self.answers = [
+                GameAnswerEntry(id=hashlib.md5(ans.encode()).hexdigest(), text=ans)
+                for ans in answers
+            ]
+
+        self._answers_by_id = {answer.id: answer for answer in self.answers}
+
+    @classmethod
+    def new(cls, question: OpenTriviaQuestion) -> "GameQuestion":
+        return cls(
+            id=get_question_hash(question.text),
+            text=question.text,
+            correct_answer=question.correct_answer,
+            incorrect_answers=question.incorrect_answers,
+        )
 
     def get_button_class(self, button_text: str) -> str:
         default_class = "button"
@@ -56,7 +75,7 @@ class GameQuestion(pydantic.BaseModel):
         return default_class
 
     def get_answer_by_id(self, answer_id: str) -> GameAnswerEntry:
-        return next(answer for answer in self.answers if answer.id == answer_id)
+        return self._answers_by_id[answer_id]
 
 
 class GameState(pydantic.BaseModel):
@@ -72,6 +91,8 @@ class Player(pydantic.BaseModel):
     avatar: utils.Avatar
     current_guess: str | None = None
     active: bool = True
+    # Counts the player's connections, a leave only applies to the one it was scheduled for.
+    joins: int = 0
 
     @classmethod
     def new(cls, session_id: str) -> "Player":
@@ -90,135 +111,490 @@ class Player(pydantic.BaseModel):
 class GameSession(pydantic.BaseModel):
     id: uuid.UUID = pydantic.Field(default_factory=uuid.uuid4)
     current_question: GameQuestion
-    question_pool: list[GameQuestion]
+    # Position in the question bank; questions are drawn lazily rather than stored up front.
+    question_cursor: int = 0
+    question_category: str | None = None
+    question_difficulty: str | None = None
+    seen_questions: set[str] = pydantic.Field(default_factory=set)
     started: datetime.datetime = pydantic.Field(default_factory=datetime.datetime.now)
     answers_url: str = "/answers"
     players: list[Player] = pydantic.Field(default_factory=list)
     timer: int = 0
+    # Bumped by every command, clients report the last version they saw when they reconnect.
+    version: int = 0
+    # Token of the worker running this round's reveal and next question timers, and when its
+    # next step is due. Guesses on other workers leave a claimed round to it.
+    round_timer: str | None = None
+    round_due: float | None = None
+    answers_revealed: bool = False
+
+    # Index and counters kept up to date by the mutation helpers below, so lookups and
+    # aggregates stay O(1) however many players a room has.
+    _players_by_id: dict[str, Player] = pydantic.PrivateAttr(default_factory=dict)
+    _active_count: int = pydantic.PrivateAttr(default=0)
+    _ready_count: int = pydantic.PrivateAttr(default=0)
+
+    def model_post_init(self, __context) -> None:
+        self._players_by_id = {player.session_id: player for player in self.players}
+        self._active_count = sum(player.active for player in self.players)
+        self._ready_count = sum(
+            player.active and player.current_guess is not None for player in self.players
+        )
 
     @pydantic.computed_field
     @property
     def active_players(self) -> list[Player]:
         return [player for player in self.players if player.active]
 
+    @pydantic.computed_field
+    @property
+    def active_count(self) -> int:
+        return self._active_count
+
+    @pydantic.computed_field
+    @property
+    def ready_count(self) -> int:
+        return self._ready_count
+
+    @pydantic.computed_field
+    @property
+    def thinking_count(self) -> int:
+        return self._active_count - self._ready_count
+
+    # Rooms past the threshold show counts plus a bounded slice of players instead of everyone.
+    @pydantic.computed_field
+    @property
+    def large_room(self) -> bool:
+        return self._active_count > config.LARGE_ROOM_THRESHOLD
+
+    @pydantic.computed_field
+    @property
+    def visible_players(self) -> list[Player]:
+        active = (player for player in self.players if player.active)
+        if not self.large_room:
+            return list(active)
+
+        return list(itertools.islice(active, config.LARGE_ROOM_PAGE_SIZE))
+
+    def is_on_first_page(self, player_session_id: str) -> bool:
+        # Whether the player's row is among visible_players, or would be if they were active, so
+        # it also tells whether a player who just left was.
+        preceding = 0
+        for player in self.players:
+            if player.session_id == player_session_id:
+                return preceding < config.LARGE_ROOM_PAGE_SIZE
+            preceding += player.active
+
+        return False
+
+    def find_player(self, player_session_id: str | None) -> Player | None:
+        return self._players_by_id.get(player_session_id) if player_session_id else None
+
     def get_player(self, player_session_id: str) -> Player:
-        return next(player for player in self.players if player.session_id == player_session_id)
+        return self._players_by_id[player_session_id]
+
+    def is_active_player(self, player_session_id: str) -> bool:
+        player = self._players_by_id.get(player_session_id)
+        return player is not None and player.active
+
+    def add_player(self, player: Player) -> None:
+        self.players.append(player)
+        self._players_by_id[player.session_id] = player
+        if player.active:
+            self._active_count += 1
+            self._ready_count += player.current_guess is not None
+
+    def activate_player(self, player_session_id: str) -> None:
+        player = self._players_by_id[player_session_id]
+        if not player.active:
+            player.active = True
+            self._active_count += 1
+            self._ready_count += player.current_guess is not None
 
     def remove_player(self, player_session_id: str) -> None:
+        player = self._players_by_id.get(player_session_id)
+        if player and player.active:
+            player.active = False
+            self._active_count -= 1
+            self._ready_count -= player.current_guess is not None
+
+    def set_player_guess(self, player_session_id: str, guess: str | None) -> None:
+        player = self._players_by_id[player_session_id]
+        if player.active:
+            self._ready_count += (guess is not None) - (player.current_guess is not None)
+        player.current_guess = guess
+
+    def reset_guesses(self) -> None:
         for player in self.players:
-            if player.session_id == player_session_id:
-                player.active = False
+            player.current_guess = None
+        self._ready_count = 0
 
     @pydantic.computed_field
     @property
     def all_guessed(self) -> bool:
-        return all(player.current_guess is not None for player in self.players if player.active)
+        return self._ready_count == self._active_count
+
+    def round_timer_expired(self) -> bool:
+        # The worker that claimed the round is long overdue, most likely gone.
+        return (
+            self.round_due is not None
+            and time.time() > self.round_due + config.ROUND_TIMER_TAKEOVER
+        )
+
+    def clear_round_timer(self) -> None:
+        self.round_timer = self.round_due = None
+
+
+Command = Callable[[GameSession], None]
 
 
 class GameSessionManager:
-    def __init__(self, trivia_db: OpenTriviaDB) -> None:
+    lock_poll_interval = 0.005
+
+    def __init__(self, trivia_db: OpenTriviaDB, question_bank: QuestionBank) -> None:
         self.store = litestar.stores.file.FileStore(config.STORE_PATH / "game_sessions")
+        self.lock_dir = config.STORE_PATH / "game_session_locks"
+        self.write_through = config.GAME_SESSION_WRITE_THROUGH
         self.db = trivia_db
+        self.bank = question_bank
+        self.flush_delay = config.GAME_SESSION_FLUSH_DELAY
+        self.ttl = config.GAME_SESSION_TTL
+        # Live sessions are the source of truth, the store is only written behind them.
+        self.sessions: dict[uuid.UUID, GameSession] = {}
+        self.dirty: set[uuid.UUID] = set()
+        self.flush_task: asyncio.Task | None = None
+        self.actors: dict[uuid.UUID, GameSessionActor] = {}
+        self.last_active: dict[uuid.UUID, float] = {}
 
     async def open_session(self) -> GameSession:
-        questions = await self.db.get(amount=10)
-        current_question = questions.pop(0)
+        drawn = self.bank.draw(self.bank.random_cursor())
+
+        if drawn is None:
+            self.bank.add(
+                await self.db.get(amount=self.bank.batch_size, token_key=self.bank.token_key)
+            )
+            drawn = self.bank.draw(0)
+
+        if drawn is None:
+            raise ValueError("No questions available")
 
+        cursor, question = drawn
+        current_question = GameQuestion.new(question)
         session = GameSession(
-            current_question=GameQuestion(
-                id=hashlib.md5(current_question.text.encode()).hexdigest(),
-                text=current_question.text,
-                correct_answer=current_question.correct_answer,
-                incorrect_answers=current_question.incorrect_answers,
-            ),
-            question_pool=[
-                GameQuestion(
-                    id=hashlib.md5(question.text.encode()).hexdigest(),
-                    text=question.text,
-                    correct_answer=question.correct_answer,
-                    incorrect_answers=question.incorrect_answers,
-                )
-                for question in questions
-            ],
+            current_question=current_question,
+            question_cursor=cursor,
+            seen_questions={current_question.id},
         )
 
         await self.save_session(session)
 
         return session
 
-    async def get_session(self, session_id: uuid.UUID) -> GameSession:
-        raw = await self.store.get(str(session_id))
+    async def get_session(self, session_id: uuid.UUID, refresh: bool = False) -> GameSession:
+        if not refresh and (session := self.sessions.get(session_id)):
+            self.last_active[session_id] = time.monotonic()
+            return session
+
+        metrics.SESSION_CACHE_MISSES.inc()
+        with metrics.STORE_READ_SECONDS.time():
+            raw = await self.store.get(str(session_id))
+
         if not raw:
+            if refresh and (session := self.sessions.get(session_id)):
+                return session
             raise ValueError("Session not found")
 
-        return GameSession.model_validate_json(raw)
+        self.last_active[session_id] = time.monotonic()
+        session = GameSession.model_validate(decode_session(raw))
+
+        if is_legacy(raw):
+            # Rewrite sessions stored as JSON in the binary format on the next flush.
+            self.dirty.add(session_id)
+
+        if refresh:
+            self.sessions[session_id] = session
+            return session
+
+        # Another coroutine may have loaded the same session while we were reading the store.
+        return self.sessions.setdefault(session_id, session)
 
     async def save_session(self, session: GameSession) -> None:
-        await self.store.delete(str(session.id))
-        await self.store.set(str(session.id), session.model_dump_json())
+        self.sessions[session.id] = session
+        self.dirty.add(session.id)
+        self.last_active[session.id] = time.monotonic()
+
+        if self.write_through:
+            # Other workers must see the room as soon as this one has changed or created it.
+            self.dirty.discard(session.id)
+            await self.write_session(session)
+            return
+
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush_later())
+
+    async def adopt_session(self, session: GameSession) -> None:
+        # Keep a cached copy in step with changes another worker made to the same room, but never
+        # go back to an older snapshot that arrived late.
+        cached = self.sessions.get(session.id)
+        if cached is not None and session.version > cached.version:
+            self.sessions[session.id] = session
+
+    @contextlib.asynccontextmanager
+    async def room_lock(self, session_id: uuid.UUID):
+        if not self.write_through:
+            yield
+            return
+
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        with (self.lock_dir / f"{session_id}.lock").open("w") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(self.lock_poll_interval)
+
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    async def flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        self.flush_task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        dirty, self.dirty = self.dirty, set()
+
+        for session_id in dirty:
+            if session := self.sessions.get(session_id):
+                await self.write_session(session)
+
+    async def write_session(self, session: GameSession) -> None:
+        with metrics.STORE_WRITE_SECONDS.time():
+            await self.store.set(str(session.id), encode_session(session), expires_in=self.ttl)
+
+    def get_idle_sessions(self, idle_for: float) -> list[uuid.UUID]:
+        deadline = time.monotonic() - idle_for
+        return [
+            session_id
+            for session_id, last_active in self.last_active.items()
+            if last_active < deadline and session_id not in self.actors
+        ]
 
-    async def join_session(self, session_id: uuid.UUID, player_session_id: str) -> GameSession:
-        session = await self.get_session(session_id)
-        player_ids = [player.session_id for player in session.players]
+    async def evict_session(self, session_id: uuid.UUID) -> None:
+        if session_id in self.dirty:
+            self.dirty.discard(session_id)
+            if session := self.sessions.get(session_id):
+                await self.write_session(session)
 
-        if player_session_id in player_ids:
-            player = session.get_player(player_session_id)
-            if not player.active:
-                player.active = True
+        self.sessions.pop(session_id, None)
+        self.last_active.pop(session_id, None)
 
-        else:
-            player = Player.new(player_session_id)
-            session.players.append(player)
+    async def close(self) -> None:
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.flush_task
 
-        await self.save_session(session)
+        await self.flush()
 
-        return session
+    async def execute(self, session_id: uuid.UUID, command: Command) -> GameSession:
+        actor = self.actors.get(session_id)
+        if actor is None:
+            actor = self.actors[session_id] = GameSessionActor(self, session_id)
 
-    async def leave_session(self, session_id: uuid.UUID, player_session_id: str) -> GameSession:
-        session = await self.get_session(session_id)
-        session.remove_player(player_session_id)
-        await self.save_session(session)
-        return session
+        return await actor.submit(command)
 
-    async def next_question(self, session_id: uuid.UUID) -> GameSession:
-        session = await self.get_session(session_id)
-        session.current_question = session.question_pool.pop(0)
-        for player in session.players:
-            player.current_guess = None
+    def draw_unseen(self, session: GameSession) -> tuple[int, OpenTriviaQuestion]:
+        cursor, fallback = session.question_cursor, None
 
-        await self.save_session(session)
+        # Skip questions the room has already answered, but only so far: a room that has seen the
+        # whole bank gets a repeat rather than no question at all.
+        for _ in range(config.QUESTION_DRAW_ATTEMPTS):
+            drawn = self.bank.draw(cursor, session.question_category, session.question_difficulty)
+            if drawn is None:
+                break
 
-        return session
+            cursor, question = drawn
+            if get_question_hash(question.text) not in session.seen_questions:
+                return drawn
+
+            fallback = fallback or drawn
+
+        if fallback is None:
+            raise ValueError("No questions available")
+
+        return fallback
+
+    async def join_session(self, session_id: uuid.UUID, player_session_id: str) -> GameSession:
+        def join(session: GameSession) -> None:
+            if session.find_player(player_session_id):
+                session.activate_player(player_session_id)
+            else:
+                session.add_player(Player.new(player_session_id))
+            session.get_player(player_session_id).joins += 1
+
+        return await self.execute(session_id, join)
+
+    async def leave_session(
+        self, session_id: uuid.UUID, player_session_id: str, joins: int
+    ) -> GameSession | None:
+        left = False
+
+        def leave(session: GameSession) -> None:
+            nonlocal left
+            # The player has connected again since, possibly to another worker.
+            player = session.find_player(player_session_id)
+            if player is None or player.joins != joins:
+                return
+
+            session.remove_player(player_session_id)
+            left = True
+
+        session = await self.execute(session_id, leave)
+        return session if left else None
+
+    # A round's timers run on whichever worker claims it first. Each step only applies while the
+    # round is still claimed with the same token, so a guess taken back on another worker cancels
+    # the pending step there too. These return None when the step no longer applies.
+    async def claim_round(self, session_id: uuid.UUID, round_timer: str) -> GameSession | None:
+        claimed = False
+
+        def claim(session: GameSession) -> None:
+            nonlocal claimed
+            if session.round_timer is not None and not session.round_timer_expired():
+                return
+
+            if session.answers_revealed:
+                delay = config.NEXT_QUESTION_DELAY
+            elif session.all_guessed:
+                delay = config.REVEAL_ANSWERS_DELAY
+            else:
+                return
+
+            session.round_timer, session.round_due = round_timer, time.time() + delay
+            claimed = True
+
+        session = await self.execute(session_id, claim)
+        return session if claimed else None
+
+    async def reveal_answers(self, session_id: uuid.UUID, round_timer: str) -> GameSession | None:
+        revealed = False
+
+        def reveal(session: GameSession) -> None:
+            nonlocal revealed
+            if session.round_timer != round_timer or session.answers_revealed:
+                return
+
+            session.answers_revealed = True
+            session.round_due = time.time() + config.NEXT_QUESTION_DELAY
+            revealed = True
+
+        session = await self.execute(session_id, reveal)
+        return session if revealed else None
+
+    async def next_question(self, session_id: uuid.UUID, round_timer: str) -> GameSession | None:
+        advanced = False
+
+        def advance(session: GameSession) -> None:
+            nonlocal advanced
+            if session.round_timer != round_timer:
+                return
+
+            session.question_cursor, question = self.draw_unseen(session)
+            session.current_question = GameQuestion.new(question)
+            session.seen_questions.add(session.current_question.id)
+            session.reset_guesses()
+            session.clear_round_timer()
+            session.answers_revealed = False
+            advanced = True
+
+        session = await self.execute(session_id, advance)
+        return session if advanced else None
 
     async def set_player_guess(
         self, session_id: uuid.UUID, player_session_id: str, guess: str
     ) -> GameSession:
-        session = await self.get_session(session_id)
-        player = session.get_player(player_session_id)
-        player.current_guess = guess
+        def set_guess(session: GameSession) -> None:
+            session.set_player_guess(player_session_id, guess)
 
-        await self.save_session(session)
-
-        return session
+        return await self.execute(session_id, set_guess)
 
     async def unset_player_guess(
         self, session_id: uuid.UUID, player_session_id: str
     ) -> GameSession:
-        session = await self.get_session(session_id)
-        player = session.get_player(player_session_id)
-        player.current_guess = None
-
-        await self.save_session(session)
-
-        return session
+        def unset_guess(session: GameSession) -> None:
+            session.set_player_guess(player_session_id, None)
+            # Not everyone has guessed any more, whichever worker holds the reveal drops it.
+            if not session.answers_revealed:
+                session.clear_round_timer()
+
+        return await self.execute(session_id, unset_guess)
+
+
+# One actor per active room applies its commands in order, so concurrent updates within a room
+# can't overwrite each other while separate rooms still progress independently.
+class GameSessionActor:
+    def __init__(self, manager: GameSessionManager, session_id: uuid.UUID) -> None:
+        self.manager = manager
+        self.session_id = session_id
+        self.idle_timeout = config.GAME_SESSION_ACTOR_IDLE_TIMEOUT
+        self.queue: asyncio.Queue[tuple[Command, asyncio.Future[GameSession]]] = asyncio.Queue()
+        self.task = asyncio.create_task(self.run())
+
+    async def submit(self, command: Command) -> GameSession:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((command, future))
+        return await future
+
+    async def run(self) -> None:
+        while True:
+            try:
+                command, future = await asyncio.wait_for(self.queue.get(), self.idle_timeout)
+            except TimeoutError:
+                if self.queue.empty():
+                    break
+                continue
+
+            if future.cancelled():
+                continue
+
+            try:
+                # Across workers the lock serializes commands and the stored session is the
+                # latest state, within one worker the cached copy is.
+                async with self.manager.room_lock(self.session_id):
+                    session = await self.manager.get_session(
+                        self.session_id, refresh=self.manager.write_through
+                    )
+                    command(session)
+                    session.version += 1
+                    await self.manager.save_session(session)
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(session)
+
+        if self.manager.actors.get(self.session_id) is self:
+            del self.manager.actors[self.session_id]
 
 
 _Manager = None
 
 
-async def get_game_session_manager(trivia_db: OpenTriviaDB) -> GameSessionManager:
+async def get_game_session_manager(
+    trivia_db: OpenTriviaDB, question_bank: QuestionBank
+) -> GameSessionManager:
     global _Manager
     if not _Manager:
-        _Manager = GameSessionManager(trivia_db)
+        _Manager = GameSessionManager(trivia_db, question_bank)
 
     return _Manager
+
+
+async def close_game_session_manager() -> None:
+    global _Manager
+    if _Manager:
+        await _Manager.close()
+        _Manager = None
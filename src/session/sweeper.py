@@ -0,0 +1,85 @@
+import asyncio
+import contextlib
+import logging
+
+import config
+
+import session.state as state
+from session.websocket import GameWebsocketListener
+
+logger = logging.getLogger(__name__)
+
+
+# Reclaims rooms nobody has touched for a while: drops them from memory and from every
+# per-room registry, and lets the store purge session files whose TTL has run out.
+class RoomSweeper:
+    def __init__(
+        self,
+        session_manager: state.GameSessionManager,
+        interval: float = config.ROOM_SWEEP_INTERVAL,
+        idle_timeout: float = config.ROOM_IDLE_TIMEOUT,
+    ) -> None:
+        self.session_manager = session_manager
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.task: asyncio.Task | None = None
+        self.sweeps = 0
+        self.reclaimed_rooms = 0
+
+    async def sweep(self) -> int:
+        sockets = GameWebsocketListener.sockets
+        idle = [
+            session_id
+            for session_id in self.session_manager.get_idle_sessions(self.idle_timeout)
+            if not sockets.get(session_id)
+        ]
+
+        for session_id in idle:
+            GameWebsocketListener.forget_room(session_id)
+            await self.session_manager.evict_session(session_id)
+
+        await self.session_manager.store.delete_expired()
+
+        self.sweeps += 1
+        self.reclaimed_rooms += len(idle)
+        if idle:
+            logger.info("Reclaimed %d idle rooms", len(idle))
+
+        return len(idle)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Room sweep failed")
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+
+_SWEEPER: RoomSweeper | None = None
+
+
+def get_room_sweeper(session_manager: state.GameSessionManager) -> RoomSweeper:
+    global _SWEEPER
+    if _SWEEPER is None:
+        _SWEEPER = RoomSweeper(session_manager)
+
+    return _SWEEPER
+
+
+async def stop_room_sweeper() -> None:
+    global _SWEEPER
+    if _SWEEPER:
+        await _SWEEPER.stop()
+        _SWEEPER = None
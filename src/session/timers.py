@@ -0,0 +1,80 @@
+import asyncio
+import inspect
+from collections.abc import Callable, Hashable
+from typing import Any
+
+import metrics
+
+TimerKey = Hashable
+
+
+# Keeps every pending round deadline in one place on top of the event loop's own timer heap,
+# so scheduling and cancelling are O(log n) / O(1) and nothing runs in executor threads.
+class TimerScheduler:
+    def __init__(self) -> None:
+        self.timers: dict[TimerKey, asyncio.TimerHandle] = {}
+        self.running: set[asyncio.Task] = set()
+
+    def schedule(self, key: TimerKey, delay: float, callback: Callable[[], Any]) -> float:
+        self.cancel(key)
+        metrics.TIMER_EVENTS.inc(label="scheduled")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + delay
+        self.timers[key] = loop.call_at(deadline, self.fire, key, callback)
+
+        return deadline
+
+    def cancel(self, key: TimerKey) -> bool:
+        handle = self.timers.pop(key, None)
+        if handle is None:
+            return False
+
+        handle.cancel()
+        metrics.TIMER_EVENTS.inc(label="cancelled")
+        return True
+
+    def deadline(self, key: TimerKey) -> float | None:
+        handle = self.timers.get(key)
+        return handle.when() if handle else None
+
+    def deadlines(self) -> dict[TimerKey, float]:
+        return {key: handle.when() for key, handle in self.timers.items()}
+
+    def __len__(self) -> int:
+        return len(self.timers)
+
+    def fire(self, key: TimerKey, callback: Callable[[], Any]) -> None:
+        del self.timers[key]
+        metrics.TIMER_EVENTS.inc(label="fired")
+        result = callback()
+
+        if inspect.isawaitable(result):
+            task = asyncio.ensure_future(result)
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    def clear(self) -> None:
+        for key in list(self.timers):
+            self.cancel(key)
+
+        for task in self.running:
+            task.cancel()
+
+
+_SCHEDULER: TimerScheduler | None = None
+
+
+def get_timer_scheduler() -> TimerScheduler:
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        _SCHEDULER = TimerScheduler()
+
+    return _SCHEDULER
+
+
+def close_timer_scheduler() -> None:
+    global _SCHEDULER
+    if _SCHEDULER:
+        _SCHEDULER.clear()
+        _SCHEDULER = None
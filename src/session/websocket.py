@@ -1,24 +1,162 @@
 import asyncio
+import logging
+import re
+import time
 import uuid
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import Callable, Hashable
+from typing import NamedTuple
 
 import config
+import jinja2
+import litestar
 import litestar.events
 import litestar.handlers
+import metrics
 import pydantic
-import utils
 
 import session.state as state
+from session.bus import Audience, BroadcastMessage, get_broadcast_bus
+from session.debounce import BroadcastDebouncer
+from session.timers import get_timer_scheduler
+
+logger = logging.getLogger(__name__)
+
+_TEMPLATES: dict[str, jinja2.Template] = {}
+_INTER_TAG_WHITESPACE = re.compile(r">\s+<")
+
+
+def load_templates() -> None:
+    engine = config.template_config.engine_instance
+    for path in sorted(config.TEMPLATES_DIR.glob("*.html")):
+        _TEMPLATES[path.name] = engine.get_template(path.name)
+
+
+def get_template(template_name: str) -> jinja2.Template:
+    template = _TEMPLATES.get(template_name)
+    if template is None:
+        engine = config.template_config.engine_instance
+        template = _TEMPLATES[template_name] = engine.get_template(template_name)
+
+    return template
+
+
+def render_template(template_name: str, context: dict | pydantic.BaseModel) -> str:
+    if isinstance(context, pydantic.BaseModel):
+        context = context.model_dump()
+
+    template = get_template(template_name)
+    with metrics.TEMPLATE_RENDER_SECONDS.time(template_name):
+        text = template.render(context)
+
+    # A single space keeps the gap between inline elements that the indentation rendered as.
+    return _INTER_TAG_WHITESPACE.sub("> <", text) if config.COMPACT_TEMPLATES else text
 
 
 class GameWebsocket(litestar.WebSocket):
+    player_session_id: str | None = None
+    # The player's join count when this socket connected.
+    joins: int = 0
+    outbox: OrderedDict[str, str] | None = None
+    outbox_ready: asyncio.Event | None = None
+    sender_task: asyncio.Task | None = None
+    closed: bool = False
+
+    # Broadcasts are queued per socket and written by the socket's own sender task, so a slow
+    # client only ever delays itself. A newer fragment for the same key replaces the queued one,
+    # and a client whose queue still overflows with distinct fragments is disconnected. Once the
+    # sender has given up on the socket, further broadcasts are dropped.
+    def enqueue(self, key: str, text: str) -> None:
+        if self.closed:
+            return
+
+        if self.outbox is None or self.outbox_ready is None:
+            self.outbox, self.outbox_ready = OrderedDict(), asyncio.Event()
+            self.sender_task = asyncio.create_task(self.run_sender())
+
+        if self.outbox.pop(key, None) is not None:
+            metrics.SOCKET_FRAGMENTS_SUPERSEDED.inc()
+        elif len(self.outbox) >= config.SOCKET_OUTBOX_SIZE:
+            self.disconnect_slow_consumer("outbox full")
+            return
+
+        self.outbox[key] = text
+        self.outbox_ready.set()
+
+    async def run_sender(self) -> None:
+        assert self.outbox is not None and self.outbox_ready is not None
+
+        while True:
+            await self.outbox_ready.wait()
+
+            while self.outbox:
+                _, text = self.outbox.popitem(last=False)
+                started = time.perf_counter()
+
+                try:
+                    await asyncio.wait_for(self.send_text(text), config.SOCKET_SEND_TIMEOUT)
+                except TimeoutError:
+                    self.disconnect_slow_consumer("send timed out")
+                    return
+                except Exception:
+                    metrics.SOCKET_SEND_ERRORS.inc()
+                    logger.warning(
+                        "Send to player %s failed", self.player_session_id, exc_info=True
+                    )
+                    self.mark_closed()
+                    return
+                finally:
+                    metrics.SOCKET_SEND_SECONDS.observe(time.perf_counter() - started)
+
+            self.outbox_ready.clear()
+
+    def mark_closed(self) -> None:
+        self.closed = True
+        if self.outbox is not None:
+            self.outbox.clear()
+
+    def disconnect_slow_consumer(self, reason: str) -> None:
+        metrics.SOCKET_SLOW_DISCONNECTS.inc(label=reason)
+        self.mark_closed()
+
+        close_task = asyncio.create_task(self.close(code=1013, reason="Too far behind"))
+        close_task.add_done_callback(lambda task: task.exception())
+
+    def stop_sender(self) -> None:
+        if self.sender_task is not None:
+            self.sender_task.cancel()
+            self.sender_task = None
+
     async def send_template(self, template_name: str, context: dict | pydantic.BaseModel) -> None:
-        if isinstance(context, pydantic.BaseModel):
-            context = context.model_dump()
+        await self.send_text(render_template(template_name, context))
 
-        template = config.template_config.engine_instance.get_template(template_name)
-        rendered = template.render(context)
-        await self.send_text(rendered)
+
+def get_visible_ids(session: state.GameSession) -> set[str]:
+    return {player.session_id for player in session.visible_players}
+
+
+# Large rooms only render the first page of players. A player past it gets their own row added
+# instead of the "that's you" marker, which would have no element to swap into.
+def is_past_page(
+    session: state.GameSession, player: state.Player | None, visible_ids: set[str]
+) -> bool:
+    return (
+        session.large_room
+        and player is not None
+        and player.active
+        and player.session_id not in visible_ids
+    )
+
+
+def get_fragment_context(
+    session: state.GameSession, player: state.Player | None, visible_ids: set[str]
+) -> dict:
+    return {
+        "player_session_id": player.session_id if player else None,
+        "game_session": session,
+        "player": player,
+        "own_row": is_past_page(session, player, visible_ids),
+    }
 
 
 class ClientData(pydantic.BaseModel):
@@ -28,18 +166,57 @@ class ClientData(pydantic.BaseModel):
     @pydantic.computed_field
     @property
     def current_player(self) -> state.Player | None:
-        try:
-            return next(
-                player
-                for player in self.game_session.players
-                if player.session_id == self.player_session_id
-            )
-        except StopIteration:
-            return None
+        return self.game_session.find_player(self.player_session_id)
+
+    def as_context(self) -> dict:
+        current_player = self.current_player
+        visible_ids = get_visible_ids(self.game_session)
+        return {
+            "player_session_id": self.player_session_id,
+            "game_session": self.game_session,
+            "current_player": current_player,
+            "own_row": is_past_page(self.game_session, current_player, visible_ids),
+        }
 
 
 ClientSessionMessage = dict[str, str]
 
+
+# Where a broadcast sits in a room's history: the session version it was rendered from and its
+# position among the broadcasts made at that version. A command can broadcast several
+# fragments, so the version alone can't tell them apart.
+JournalSeq = tuple[int, int]
+
+
+class JournalEntry(NamedTuple):
+    version: int
+    position: int
+    template_name: str
+    player_session_id: str | None
+    audience: Audience
+
+    @property
+    def seq(self) -> JournalSeq:
+        return self.version, self.position
+
+
+def format_journal_seq(seq: JournalSeq) -> str:
+    return f"{seq[0]}.{seq[1]}"
+
+
+def parse_journal_seq(text: str | None) -> JournalSeq:
+    # A bare version is what pages rendered before any broadcast report.
+    version, _, index = (text or "").partition(".")
+    try:
+        return int(version), int(index or -1)
+    except ValueError:
+        return -1, -1
+
+
+def render_seq(seq: JournalSeq) -> str:
+    return render_template("state-version.html", {"journal_seq": format_journal_seq(seq)})
+
+
 PlayerJoinedEvent = "player-joined"
 PlayerLeftEvent = "player-left"
 PlayerGuessSetEvent = "guess-set"
@@ -48,14 +225,81 @@ RevealAnswers = "reveal-answers"
 NextQuestion = "next-question"
 
 
-@litestar.events.listener(PlayerJoinedEvent, PlayerLeftEvent)
-async def update_players_after_join(game_session: state.GameSession, **kwargs):
-    await GameWebsocketListener.broadcast_template("players.html", game_session)
+@litestar.events.listener(PlayerJoinedEvent)
+async def update_players_after_join(
+    game_session: state.GameSession,
+    player_session_id: str,
+    newly_active: bool = True,
+    **kwargs,
+):
+    # The joining player needs the whole list, everyone else only gets their avatar appended.
+    tasks = [
+        GameWebsocketListener.broadcast_template(
+            "players.html", game_session, player_session_id, audience="player"
+        )
+    ]
+
+    if not newly_active:
+        pass
+    elif game_session.large_room:
+        # The room only needs the whole list again when it just turned large or the first page
+        # changed, otherwise the counts are all that moved.
+        relist = game_session.active_count == config.LARGE_ROOM_THRESHOLD + 1
+        if relist or game_session.is_on_first_page(player_session_id):
+            template_name = "players.html"
+        else:
+            template_name = "players-summary.html"
+        tasks.append(GameWebsocketListener.broadcast_template(template_name, game_session))
+    else:
+        tasks.append(
+            GameWebsocketListener.broadcast_template(
+                "player-joined.html", game_session, player_session_id, audience="others"
+            )
+        )
+
+    await asyncio.gather(*tasks)
+
+
+@litestar.events.listener(PlayerLeftEvent)
+async def update_players_after_leave(
+    game_session: state.GameSession, player_session_id: str, **kwargs
+):
+    # Dropping back to the threshold switches the room out of large mode, which needs a full list,
+    # as does a large room losing a player from its first page.
+    if game_session.active_count == config.LARGE_ROOM_THRESHOLD or (
+        game_session.large_room and game_session.is_on_first_page(player_session_id)
+    ):
+        await GameWebsocketListener.broadcast_template("players.html", game_session)
+        return
+
+    if game_session.large_room:
+        await GameWebsocketListener.broadcast_template("players-summary.html", game_session)
+        return
+
+    await GameWebsocketListener.broadcast_template(
+        "player-left.html", game_session, player_session_id
+    )
 
 
 @litestar.events.listener(PlayerGuessSetEvent, PlayerGuessUnsetEvent)
-async def update_player_status_after_guess(game_session: state.GameSession, **kwargs):
-    await GameWebsocketListener.broadcast_template("players.html", game_session)
+async def update_player_status_after_guess(
+    game_session: state.GameSession, player_session_id: str, **kwargs
+):
+    if not game_session.large_room:
+        await GameWebsocketListener.broadcast_template(
+            "player-status.html", game_session, player_session_id
+        )
+        return
+
+    # Large rooms see the counts change, the player's status only where their row is shown: on
+    # the first page for everyone, past it only in the player's own list.
+    audience: Audience = "all" if game_session.is_on_first_page(player_session_id) else "player"
+    await asyncio.gather(
+        GameWebsocketListener.broadcast_template("players-summary.html", game_session),
+        GameWebsocketListener.broadcast_template(
+            "player-status.html", game_session, player_session_id, audience=audience
+        ),
+    )
 
 
 @litestar.events.listener(RevealAnswers)
@@ -64,13 +308,7 @@ async def reveal_answers(game_session: state.GameSession, **kwargs):
 
 
 @litestar.events.listener(NextQuestion)
-async def next_question(
-    game_session: state.GameSession,
-    session_manager: state.GameSessionManager,
-    **kwargs,
-):
-    game_session = await session_manager.next_question(game_session.id)
-
+async def next_question(game_session: state.GameSession, **kwargs):
     tasks = [
         GameWebsocketListener.broadcast_template("question.html", game_session),
         GameWebsocketListener.broadcast_template("players.html", game_session),
@@ -80,12 +318,79 @@ async def next_question(
 
 
 @litestar.events.listener(PlayerGuessSetEvent, PlayerGuessUnsetEvent)
-async def update_answers_after_guess(game_session: state.GameSession, **kwargs):
-    await GameWebsocketListener.broadcast_template("answers.html", game_session)
+async def update_answers_after_guess(
+    game_session: state.GameSession, player_session_id: str, **kwargs
+):
+    # Other players' answer buttons don't depend on this guess.
+    await GameWebsocketListener.broadcast_template(
+        "answers.html", game_session, player_session_id, audience="player"
+    )
+
+
+def get_player_guess(player: state.Player | None) -> str | None:
+    return player.current_guess if player else None
+
+
+def is_recipient(
+    audience: Audience, subject_session_id: str | None, player_session_id: str | None
+) -> bool:
+    if audience == "player":
+        return player_session_id == subject_session_id
+    if audience == "others":
+        return player_session_id != subject_session_id
+    return True
+
+
+def get_leave_key(game_session_id: uuid.UUID, player_session_id: str) -> tuple:
+    return (game_session_id, PlayerLeftEvent, player_session_id)
+
+
+# Templates that depend on the receiving player, mapped to the part of the player they depend on.
+# Sockets with the same key share one render, every other template renders once per room.
+PERSONAL_TEMPLATES: dict[str, Callable[[state.Player | None], Hashable]] = {
+    "question.html": get_player_guess,
+    "answers.html": get_player_guess,
+}
+
+# Shared templates followed by a small per-player fragment instead of a full per-player render.
+PERSONAL_FRAGMENTS = {
+    "players.html": "player-you.html",
+}
+
+
+# Per-player delta templates and the full template a burst of them collapses into.
+DELTA_TEMPLATES = {
+    "player-joined.html": "players.html",
+    "player-left.html": "players.html",
+    "player-status.html": "players.html",
+}
+
+# Room-wide player list updates, the only broadcasts held back to be coalesced. A player's own
+# fragments and question changes go out right away.
+BATCHED_TEMPLATES = {"players.html", "players-summary.html", *DELTA_TEMPLATES}
+
+_DEBOUNCER: BroadcastDebouncer | None = None
+
+
+def get_broadcast_debouncer() -> BroadcastDebouncer:
+    global _DEBOUNCER
+    if _DEBOUNCER is None:
+        _DEBOUNCER = BroadcastDebouncer(
+            get_timer_scheduler(), get_broadcast_bus().publish, DELTA_TEMPLATES
+        )
+
+    return _DEBOUNCER
+
+
+def close_broadcast_debouncer() -> None:
+    # Pending flushes are timers, they are dropped along with the timer scheduler.
+    global _DEBOUNCER
+    _DEBOUNCER = None
 
 
 LISTENERS = [
     update_players_after_join,
+    update_players_after_leave,
     update_player_status_after_guess,
     update_answers_after_guess,
     reveal_answers,
@@ -96,8 +401,9 @@ LISTENERS = [
 class GameWebsocketListener(litestar.handlers.WebsocketListener):
     path = "/game-session"
     sockets: dict[uuid.UUID, list[GameWebsocket]] = defaultdict(list)
-    reveal_answers_tasks = {}
-    next_question_tasks = {}
+    journals: dict[uuid.UUID, deque[JournalEntry]] = defaultdict(
+        lambda: deque(maxlen=config.ROOM_JOURNAL_SIZE)
+    )
 
     async def on_accept(
         self,
@@ -106,15 +412,31 @@ class GameWebsocketListener(litestar.handlers.WebsocketListener):
         player_session_id: str,
         session_manager: state.GameSessionManager,
     ) -> None:
+        socket.player_session_id = player_session_id
+        resumed = get_timer_scheduler().cancel(get_leave_key(game_session_id, player_session_id))
+        session = await session_manager.get_session(game_session_id)
+        newly_active = not session.is_active_player(player_session_id)
+
+        # Joining again even when resuming: a leave still pending on another worker, for a
+        # connection the player had there, then no longer applies.
         session = await session_manager.join_session(
             session_id=game_session_id,
             player_session_id=player_session_id,
         )
+        socket.joins = session.get_player(player_session_id).joins
         self.sockets[game_session_id].append(socket)
+
+        # Back within the grace window: the room never saw the player leave, so there is nothing
+        # to broadcast. The client asks for what it missed with a Resume command.
+        if resumed and not newly_active:
+            return
+
         socket.app.emit(
             PlayerJoinedEvent,
             game_session=session,
             session_manager=session_manager,
+            player_session_id=player_session_id,
+            newly_active=newly_active,
         )
 
     async def on_disconnect(
@@ -124,16 +446,37 @@ class GameWebsocketListener(litestar.handlers.WebsocketListener):
         player_session_id: str,
         session_manager: state.GameSessionManager,
     ) -> None:
-        session = await session_manager.leave_session(
-            session_id=game_session_id,
-            player_session_id=player_session_id,
-        )
-        self.sockets[game_session_id].remove(socket)
-        socket.app.emit(
-            PlayerLeftEvent,
-            game_session=session,
-            session_manager=session_manager,
-        )
+        socket.stop_sender()
+        sockets = self.sockets[game_session_id]
+        sockets.remove(socket)
+        if not sockets:
+            del self.sockets[game_session_id]
+
+        app, joins = socket.app, socket.joins
+
+        async def leave() -> None:
+            session = await session_manager.leave_session(
+                session_id=game_session_id,
+                player_session_id=player_session_id,
+                joins=joins,
+            )
+            if session is None:
+                return
+
+            app.emit(
+                PlayerLeftEvent,
+                game_session=session,
+                session_manager=session_manager,
+                player_session_id=player_session_id,
+            )
+
+        # Flapping connections shouldn't flood the room with leave and join broadcasts.
+        if config.RECONNECT_GRACE > 0:
+            get_timer_scheduler().schedule(
+                get_leave_key(game_session_id, player_session_id), config.RECONNECT_GRACE, leave
+            )
+        else:
+            await leave()
 
     async def on_receive(
         self,
@@ -155,25 +498,11 @@ class GameWebsocketListener(litestar.handlers.WebsocketListener):
                     PlayerGuessSetEvent,
                     game_session=session,
                     session_manager=session_manager,
+                    player_session_id=player_session_id,
                 )
 
                 if session.all_guessed:
-                    self.next_question_tasks[game_session_id] = asyncio.create_task(
-                        utils.chain_awaitables(
-                            asyncio.sleep(5),
-                            utils.sync_to_async(socket.app.emit)(
-                                RevealAnswers,
-                                game_session=session,
-                                session_manager=session_manager,
-                            ),
-                            asyncio.sleep(5),
-                            utils.sync_to_async(socket.app.emit)(
-                                NextQuestion,
-                                game_session=session,
-                                session_manager=session_manager,
-                            ),
-                        )
-                    )
+                    await self.schedule_reveal(socket.app, session, session_manager)
             case "UnsetGuess":
                 session = await session_manager.unset_player_guess(
                     session_id=game_session_id,
@@ -184,43 +513,184 @@ class GameWebsocketListener(litestar.handlers.WebsocketListener):
                     PlayerGuessUnsetEvent,
                     game_session=session,
                     session_manager=session_manager,
+                    player_session_id=player_session_id,
                 )
-                next_question_task = self.next_question_tasks.pop(game_session_id, None)
-
-                if next_question_task:
-                    next_question_task.cancel()
+                get_timer_scheduler().cancel((game_session_id, RevealAnswers))
+            case "Resume":
+                session = await session_manager.get_session(game_session_id)
+                self.resume(socket, session, parse_journal_seq(data.get("Version")))
 
         return "Received."
 
+    @classmethod
+    def resume(cls, socket: GameWebsocket, session: state.GameSession, seq: JournalSeq) -> None:
+        # Fragments broadcast after the client's seq are rendered again from the current state,
+        # deltas as the full template they belong to. The journal only numbers a version's
+        # broadcasts from the start once it holds an older version, otherwise a gap gets the
+        # whole board instead.
+        journal = cls.journals.get(session.id)
+        if journal and journal[0].version < seq[0]:
+            missed: dict[str, None] = {}
+            for entry in journal:
+                if entry.seq > seq and is_recipient(
+                    entry.audience, entry.player_session_id, socket.player_session_id
+                ):
+                    template_name = DELTA_TEMPLATES.get(entry.template_name, entry.template_name)
+                    missed.pop(template_name, None)
+                    missed[template_name] = None
+            template_names = list(missed)
+        elif not journal and seq[0] >= session.version:
+            template_names = []
+        else:
+            template_names = ["question.html", "players.html"]
+
+        if not template_names:
+            return
+
+        player = session.find_player(socket.player_session_id)
+        for template_name in template_names:
+            text = render_template(
+                template_name,
+                {"game_session": session, "current_player": player, "player": player},
+            )
+            if fragment_name := PERSONAL_FRAGMENTS.get(template_name):
+                text += render_template(
+                    fragment_name,
+                    get_fragment_context(session, player, get_visible_ids(session)),
+                )
+
+            socket.enqueue(f"{template_name}:resume", text)
+
+        seq = journal[-1].seq if journal else (session.version, -1)
+        socket.enqueue("state-version.html", render_seq(seq))
+
     @staticmethod
-    async def get_client_data_from_socket(
-        game_session: state.GameSession,
-        socket: GameWebsocket,
-    ) -> ClientData:
-        return ClientData(
-            player_session_id=await utils.get_player_session_id(socket),
-            game_session=game_session,
+    async def schedule_reveal(
+        app: litestar.Litestar,
+        session: state.GameSession,
+        session_manager: state.GameSessionManager,
+    ) -> None:
+        # Only the worker whose claim lands runs the round's timers, a guess on another worker
+        # while they are pending finds the round taken.
+        round_timer = uuid.uuid4().hex
+        claimed = await session_manager.claim_round(session.id, round_timer)
+        if claimed is None:
+            return
+
+        scheduler = get_timer_scheduler()
+
+        async def reveal() -> None:
+            revealed = await session_manager.reveal_answers(session.id, round_timer)
+            if revealed is None:
+                return
+
+            app.emit(RevealAnswers, game_session=revealed, session_manager=session_manager)
+            scheduler.schedule((session.id, NextQuestion), config.NEXT_QUESTION_DELAY, advance)
+
+        async def advance() -> None:
+            advanced = await session_manager.next_question(session.id, round_timer)
+            if advanced is not None:
+                app.emit(NextQuestion, game_session=advanced, session_manager=session_manager)
+
+        # A round taken over from a worker that went away may already have its answers revealed.
+        if claimed.answers_revealed:
+            scheduler.schedule((session.id, NextQuestion), config.NEXT_QUESTION_DELAY, advance)
+        else:
+            scheduler.schedule((session.id, RevealAnswers), config.REVEAL_ANSWERS_DELAY, reveal)
+
+    @classmethod
+    def forget_room(cls, session_id: uuid.UUID) -> None:
+        cls.sockets.pop(session_id, None)
+        cls.journals.pop(session_id, None)
+
+        scheduler = get_timer_scheduler()
+        scheduler.cancel((session_id, RevealAnswers))
+        scheduler.cancel((session_id, NextQuestion))
+        get_broadcast_debouncer().forget(session_id)
+
+    @classmethod
+    def forget_rooms(cls) -> None:
+        cls.sockets.clear()
+        cls.journals.clear()
+
+    @classmethod
+    async def broadcast_template(
+        cls,
+        template_name: str,
+        session: state.GameSession,
+        player_session_id: str | None = None,
+        audience: Audience = "all",
+    ) -> None:
+        message = BroadcastMessage(
+            template_name=template_name,
+            game_session=session,
+            player_session_id=player_session_id,
+            audience=audience,
         )
 
+        if audience == "player" or template_name not in BATCHED_TEMPLATES:
+            window = 0.0
+        elif session.large_room:
+            window = config.LARGE_ROOM_UPDATE_WINDOW
+        else:
+            window = config.BROADCAST_COALESCE_WINDOW
+
+        await get_broadcast_debouncer().submit(message, window)
+
     @classmethod
-    async def broadcast_template(cls, template_name: str, session: state.GameSession) -> None:
-        for socket in cls.sockets[session.id]:
-            data = await cls.get_client_data_from_socket(session, socket)
-            await socket.send_template(template_name, data)
+    async def deliver(cls, message: BroadcastMessage) -> None:
+        template_name, session = message.template_name, message.game_session
+        sockets = cls.sockets.get(session.id)
+
+        # Journaled on every worker the room has had sockets on, until the sweeper forgets it,
+        # a dropped player reconnecting elsewhere gets the whole board. Each version's broadcasts
+        # come from the worker that ran its command, in order, so every worker numbers them the
+        # same way. A journal started partway through a version is only trusted after it.
+        if not sockets and session.id not in cls.journals:
+            return
+
+        journal = cls.journals[session.id]
+        last = journal[-1] if journal else None
+        position = last.position + 1 if last and last.version == session.version else 0
+        entry = JournalEntry(
+            session.version, position, template_name, message.player_session_id, message.audience
+        )
+        journal.append(entry)
 
-    @staticmethod
-    def create_emit_after_task(
-        socket: GameWebsocket,
-        event_type: str,
-        game_session: state.GameSession,
-        session_manager: state.GameSessionManager,
-        delay: int,
-    ) -> asyncio.Task:
-        async def _emit():
-            socket.app.emit(
-                event_type,
-                game_session=game_session,
-                session_manager=session_manager,
-            )
+        if not sockets:
+            return
+
+        get_render_key = PERSONAL_TEMPLATES.get(template_name)
+        fragment_name = PERSONAL_FRAGMENTS.get(template_name)
+        rendered: dict[Hashable, str] = {}
+
+        subject = session.find_player(message.player_session_id)
+        fragment_key = f"{template_name}:{message.player_session_id or ''}"
+
+        version_text = render_seq(entry.seq)
+        visible_ids = get_visible_ids(session) if fragment_name else set()
+
+        for socket in sockets:
+            if not is_recipient(
+                message.audience, message.player_session_id, socket.player_session_id
+            ):
+                continue
+
+            player = session.find_player(socket.player_session_id)
+            key = get_render_key(player) if get_render_key else None
+
+            if key not in rendered:
+                # Pass the live models rather than a dump, templates only evaluate what they read.
+                rendered[key] = render_template(
+                    template_name,
+                    {"game_session": session, "current_player": player, "player": subject},
+                )
+
+            text = rendered[key]
+            if fragment_name:
+                text += render_template(
+                    fragment_name, get_fragment_context(session, player, visible_ids)
+                )
 
-        return utils.create_delayed_task(_emit(), delay)
+            socket.enqueue(fragment_key, text)
+            socket.enqueue("state-version.html", version_text)
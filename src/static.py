@@ -0,0 +1,138 @@
+import dataclasses
+import gzip
+import hashlib
+import mimetypes
+import re
+from pathlib import Path
+
+import brotli
+import config
+import litestar
+from litestar.exceptions import NotFoundException
+from litestar.response import Response
+
+HASHED_NAME = re.compile(r"^(?P<stem>.+)\.[0-9a-f]{12}(?P<suffix>\.[^.]+)$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=300"
+
+
+@dataclasses.dataclass(frozen=True)
+class Asset:
+    path: str
+    hashed_path: str
+    content_type: str
+    digest: str
+    variants: dict[str, bytes]
+
+    # Each encoding is a different representation, so each one gets its own strong validator.
+    def etag(self, encoding: str) -> str:
+        return f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+
+
+# Assets are read, hashed and compressed once, then served from memory under content-hashed
+# URLs that can be cached forever. Requests for the plain or an outdated hashed name still
+# resolve, just without the immutable cache header.
+class AssetManifest:
+    def __init__(self, root: Path, url_prefix: str = "/static") -> None:
+        self.root = root
+        self.url_prefix = url_prefix
+        self.assets: dict[str, Asset] = {}
+        self.hashed: dict[str, Asset] = {}
+
+    def build(self) -> None:
+        for file in sorted(self.root.rglob("*")):
+            if not file.is_file():
+                continue
+
+            content = file.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            path = file.relative_to(self.root).as_posix()
+            hashed_path = Path(path).with_name(f"{file.stem}.{digest}{file.suffix}").as_posix()
+
+            variants = {
+                "identity": content,
+                "gzip": gzip.compress(content, mtime=0),
+                "br": brotli.compress(content),
+            }
+
+            asset = Asset(
+                path=path,
+                hashed_path=hashed_path,
+                content_type=mimetypes.guess_type(file.name)[0] or "application/octet-stream",
+                digest=digest,
+                variants=variants,
+            )
+            self.assets[path] = asset
+            self.hashed[hashed_path] = asset
+
+    def url(self, path: str) -> str:
+        asset = self.assets.get(path)
+        return f"{self.url_prefix}/{asset.hashed_path if asset else path}"
+
+    def resolve(self, path: str) -> tuple[Asset, bool] | None:
+        if asset := self.hashed.get(path):
+            return asset, True
+
+        if match := HASHED_NAME.match(path):
+            path = match["stem"] + match["suffix"]
+
+        asset = self.assets.get(path)
+        return (asset, False) if asset else None
+
+
+def choose_encoding(accept_encoding: str, asset: Asset) -> str:
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in accepted and encoding in asset.variants:
+            return encoding
+
+    return "identity"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so a W/ prefix doesn't prevent a match.
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+_MANIFEST: AssetManifest | None = None
+
+
+def get_asset_manifest() -> AssetManifest:
+    global _MANIFEST
+    if _MANIFEST is None:
+        _MANIFEST = AssetManifest(config.ASSETS_DIR)
+        _MANIFEST.build()
+
+    return _MANIFEST
+
+
+def static_url(path: str) -> str:
+    return get_asset_manifest().url(path)
+
+
+@litestar.get("/static/{path:path}", include_in_schema=False)
+async def static_asset(path: str, request: litestar.Request) -> Response:
+    resolved = get_asset_manifest().resolve(path.lstrip("/"))
+    if resolved is None:
+        raise NotFoundException
+
+    asset, immutable = resolved
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""), asset)
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("if-none-match", ""), headers["ETag"]):
+        return Response(content=b"", status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return Response(
+        content=asset.variants[encoding], media_type=asset.content_type, headers=headers
+    )
@@ -0,0 +1,101 @@
+from collections import OrderedDict
+from datetime import timedelta
+
+import config
+import metrics
+from litestar.stores.base import StorageObject, Store
+from litestar.stores.file import FileStore
+
+
+# Client sessions are read on every request and websocket handshake, so they are served from an
+# in-process LRU. An optional persistent store behind it is written through and only read on a
+# miss, which lets sessions survive restarts without a disk read per lookup.
+class CachedStore(Store):
+    def __init__(self, max_size: int, persistent: Store | None = None) -> None:
+        self.max_size = max_size
+        self.persistent = persistent
+        self.entries: OrderedDict[str, StorageObject] = OrderedDict()
+
+    def put(self, key: str, storage_object: StorageObject) -> None:
+        self.entries[key] = storage_object
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            metrics.CLIENT_SESSION_EVICTIONS.inc()
+
+    def lookup(self, key: str) -> StorageObject | None:
+        storage_object = self.entries.get(key)
+        if storage_object is not None and storage_object.expired:
+            del self.entries[key]
+            return None
+
+        return storage_object
+
+    async def set(
+        self, key: str, value: str | bytes, expires_in: int | timedelta | None = None
+    ) -> None:
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+
+        self.put(key, StorageObject.new(data=value, expires_in=expires_in))
+        if self.persistent is not None:
+            await self.persistent.set(key, value, expires_in)
+
+    async def get(self, key: str, renew_for: int | timedelta | None = None) -> bytes | None:
+        storage_object = self.lookup(key)
+
+        if storage_object is None:
+            metrics.CLIENT_SESSION_LOOKUPS.inc(label="miss")
+            if self.persistent is None:
+                return None
+
+            value = await self.persistent.get(key, renew_for)
+            if value is None:
+                return None
+
+            expires_in = await self.persistent.expires_in(key)
+            self.put(key, StorageObject.new(data=value, expires_in=expires_in))
+            return value
+
+        metrics.CLIENT_SESSION_LOOKUPS.inc(label="hit")
+        self.entries.move_to_end(key)
+
+        if renew_for and storage_object.expires_at:
+            await self.set(key, storage_object.data, renew_for)
+
+        return storage_object.data
+
+    async def delete(self, key: str) -> None:
+        self.entries.pop(key, None)
+        if self.persistent is not None:
+            await self.persistent.delete(key)
+
+    async def delete_all(self) -> None:
+        self.entries.clear()
+        if self.persistent is not None:
+            await self.persistent.delete_all()
+
+    async def exists(self, key: str) -> bool:
+        if self.lookup(key) is not None:
+            return True
+
+        return self.persistent is not None and await self.persistent.exists(key)
+
+    async def expires_in(self, key: str) -> int | None:
+        storage_object = self.lookup(key)
+        if storage_object is not None:
+            return storage_object.expires_in if storage_object.expires_at else None
+
+        return await self.persistent.expires_in(key) if self.persistent is not None else None
+
+
+def create_client_session_store() -> Store:
+    if not config.CLIENT_SESSION_CACHE:
+        return FileStore(path=config.STORE_PATH / "client_sessions")
+
+    persistent = None
+    if config.CLIENT_SESSION_PERSIST:
+        persistent = FileStore(path=config.STORE_PATH / "client_sessions")
+
+    return CachedStore(config.CLIENT_SESSION_CACHE_SIZE, persistent)
@@ -0,0 +1,79 @@
+import contextlib
+import datetime
+from collections.abc import Awaitable, Callable
+
+import config
+import pytest
+from aiohttp import web
+from api import OpenTriviaDB
+from bank import QuestionBank
+from session.state import GameQuestion, GameSession, GameSessionManager
+
+
+@pytest.fixture(autouse=True)
+def store_path(tmp_path, monkeypatch):
+    # Keep sessions, the question bank and template bytecode out of the source tree.
+    monkeypatch.setattr(config, "STORE_PATH", tmp_path)
+    monkeypatch.setattr(config, "QUESTION_BANK_PATH", tmp_path / "questions.sqlite3")
+    monkeypatch.setattr(config, "TEMPLATE_CACHE_DIR", tmp_path / "template_cache")
+    return tmp_path
+
+
+def make_question(text: str = "Which planet is known as the Red Planet?") -> GameQuestion:
+    return GameQuestion(
+        id=text,
+        text=text,
+        correct_answer="Mars",
+        incorrect_answers=["Venus", "Jupiter", "Mercury"],
+    )
+
+
+def make_session() -> GameSession:
+    return GameSession(current_question=make_question())
+
+
+def make_trivia_db() -> OpenTriviaDB:
+    # Nothing listens on the discard port, a test that reaches OpenTDB fails instead of going out.
+    return OpenTriviaDB(base_url="http://127.0.0.1:9", api_path="/api.php")
+
+
+def make_manager() -> GameSessionManager:
+    trivia_db = make_trivia_db()
+    return GameSessionManager(trivia_db, QuestionBank(config.QUESTION_BANK_PATH, trivia_db))
+
+
+def make_api_question(index: int, difficulty: str = "easy") -> dict:
+    return {
+        "type": "multiple",
+        "category": "Science",
+        "difficulty": difficulty,
+        "question": f"Question &quot;{index}&quot;?",
+        "correct_answer": "Yes",
+        "incorrect_answers": ["No", "Maybe", "Later"],
+    }
+
+
+async def issue_token(request: web.Request) -> web.Response:
+    return web.json_response({"response_code": 0, "token": "stub-token"})
+
+
+@contextlib.asynccontextmanager
+async def serve_opentdb(api: Callable[[web.Request], Awaitable[web.Response]]):
+    # A local stand-in for OpenTDB, with the rate limit and retry backoff switched off.
+    app = web.Application()
+    app.router.add_get("/api.php", api)
+    app.router.add_get("/api_token.php", issue_token)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    trivia_db = OpenTriviaDB(base_url=f"http://127.0.0.1:{port}", api_path="/api.php")
+    trivia_db.min_interval = datetime.timedelta(0)
+    trivia_db.backoff = datetime.timedelta(0)
+    try:
+        yield trivia_db
+    finally:
+        await trivia_db.close()
+        await runner.cleanup()
@@ -0,0 +1,106 @@
+import asyncio
+import datetime
+
+from aiohttp import web
+from api import OpenTriviaDB
+from conftest import make_api_question, serve_opentdb
+
+
+def serve_responses(responses: list[tuple[int, dict]], requests: list[dict], delay: float = 0):
+    async def api(request: web.Request) -> web.Response:
+        requests.append(dict(request.query))
+        await asyncio.sleep(delay)
+        status, body = responses.pop(0) if responses else (200, {"response_code": 1})
+        return web.json_response({"results": [], **body}, status=status)
+
+    return serve_opentdb(api)
+
+
+def results(*indexes: int) -> tuple[int, dict]:
+    return 200, {
+        "response_code": OpenTriviaDB.SUCCESS,
+        "results": [make_api_question(index) for index in indexes],
+    }
+
+
+def test_server_errors_are_retried():
+    async def run():
+        responses = [(500, {}), (503, {}), results(1)]
+        requests: list[dict] = []
+
+        async with serve_responses(responses, requests) as trivia_db:
+            questions = await trivia_db.get(1)
+            return [question.text for question in questions], len(requests)
+
+    assert asyncio.run(run()) == (['Question "1"?'], 3)
+
+
+def test_client_errors_are_not_retried():
+    async def run():
+        requests: list[dict] = []
+
+        async with serve_responses([(404, {}), results(1)], requests) as trivia_db:
+            try:
+                await trivia_db.get(1)
+            except Exception as exc:
+                return type(exc).__name__, len(requests)
+
+    assert asyncio.run(run()) == ("ClientResponseError", 1)
+
+
+def test_rate_limited_responses_are_retried():
+    async def run():
+        responses = [(200, {"response_code": OpenTriviaDB.RATE_LIMIT}), results(1, 2)]
+        requests: list[dict] = []
+
+        async with serve_responses(responses, requests) as trivia_db:
+            questions = await trivia_db.get(2)
+            return len(questions), len(requests)
+
+    assert asyncio.run(run()) == (2, 2)
+
+
+def test_requests_are_spaced_by_the_rate_limit():
+    async def run():
+        arrivals: list[float] = []
+
+        async def api(request: web.Request) -> web.Response:
+            arrivals.append(asyncio.get_running_loop().time())
+            return web.json_response({"response_code": OpenTriviaDB.NO_RESULTS, "results": []})
+
+        async with serve_opentdb(api) as trivia_db:
+            trivia_db.min_interval = datetime.timedelta(seconds=0.05)
+            await asyncio.gather(*(trivia_db.get(1, category=index) for index in range(3)))
+
+        return [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+
+    assert all(gap >= 0.045 for gap in asyncio.run(run()))
+
+
+def test_identical_requests_in_flight_share_one_round_trip():
+    async def run():
+        requests: list[dict] = []
+
+        async with serve_responses([results(1), results(2)], requests, 0.05) as trivia_db:
+            batches = await asyncio.gather(
+                *(trivia_db.get(1, difficulty="easy") for _ in range(5)),
+                trivia_db.get(1, difficulty="hard"),
+            )
+            return [len(batch) for batch in batches], len(requests)
+
+    assert asyncio.run(run()) == ([1] * 6, 2)
+
+
+def test_client_can_be_reopened_on_another_event_loop():
+    trivia_db = OpenTriviaDB(base_url="http://127.0.0.1", api_path="/api.php")
+    trivia_db.min_interval = datetime.timedelta(seconds=0.01)
+
+    async def run():
+        await trivia_db.start()
+        await trivia_db.wait_for_rate_limit()
+        # Waiting on the rate limit while another call sleeps binds the lock to the running loop.
+        await asyncio.gather(*(trivia_db.wait_for_rate_limit() for _ in range(2)))
+        await trivia_db.close()
+
+    asyncio.run(run())
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import datetime
+
+import api
+import config
+from api import OpenTriviaQuestion
+from app import app, create_app
+from bank import QuestionBank
+from conftest import make_api_question, make_trivia_db
+from litestar.contrib.jinja import JinjaTemplateEngine
+from litestar.testing import TestClient
+
+
+def test_building_the_app_does_no_io(store_path):
+    store_path.rmdir()
+
+    # The shared engine is only configured once per process, so configure a fresh one as well.
+    config.configure_template_engine(JinjaTemplateEngine(directory=config.TEMPLATES_DIR))
+    create_app()
+
+    assert not store_path.exists()
+
+
+def test_app_serves_rooms_across_consecutive_lifecycles(monkeypatch):
+    # Nothing should reach OpenTDB, the bank is stocked above its low watermark.
+    trivia_db = make_trivia_db()
+    trivia_db.min_interval = datetime.timedelta(0)
+    monkeypatch.setattr(api, "_DB", trivia_db)
+
+    bank = QuestionBank(config.QUESTION_BANK_PATH, trivia_db)
+    bank.open()
+    bank.add(
+        [
+            OpenTriviaQuestion.model_validate(make_api_question(index))
+            for index in range(config.QUESTION_BANK_LOW_WATERMARK)
+        ]
+    )
+    bank.close()
+
+    managers = []
+    for _ in range(2):
+        with TestClient(app) as client:
+            response = client.get("/")
+            assert response.status_code == 200
+            assert response.url.path.startswith("/game/")
+            assert "Question &#34;" in response.text
+            managers.append(client.app.state.session_manager)
+
+        assert "session_manager" not in client.app.state
+
+    assert managers[0] is not managers[1]
@@ -0,0 +1,85 @@
+import asyncio
+
+import config
+from aiohttp import web
+from api import OpenTriviaQuestion
+from bank import QuestionBank
+from conftest import make_api_question, make_trivia_db, serve_opentdb
+
+
+def serve_batches(batches: list[list[dict]], requests: list[dict]):
+    async def api(request: web.Request) -> web.Response:
+        requests.append(dict(request.query))
+        results = batches.pop(0) if batches else []
+        return web.json_response({"response_code": 0 if results else 1, "results": results})
+
+    return serve_opentdb(api)
+
+
+def test_add_deduplicates_by_question_hash():
+    async def run():
+        bank = QuestionBank(config.QUESTION_BANK_PATH, make_trivia_db())
+        bank.open()
+        question = OpenTriviaQuestion.model_validate(make_api_question(1))
+        try:
+            return bank.add([question, question]), bank.add([question]), bank.count()
+        finally:
+            bank.close()
+
+    assert asyncio.run(run()) == (1, 0, 1)
+
+
+def test_refill_fetches_from_opentdb_and_skips_duplicates():
+    async def run():
+        batches = [
+            [make_api_question(index, "hard") for index in range(3)],
+            [make_api_question(index, "hard") for index in range(2, 5)],
+        ]
+        requests: list[dict] = []
+
+        async with serve_batches(batches, requests) as trivia_db:
+            bank = QuestionBank(config.QUESTION_BANK_PATH, trivia_db, batch_size=3)
+            bank.open()
+            try:
+                added = [await bank.refill(difficulty="hard") for _ in range(2)]
+                return added, bank.count(difficulty="hard"), requests
+            finally:
+                bank.close()
+
+    added, count, requests = asyncio.run(run())
+
+    assert added == [3, 2]
+    assert count == 5
+    assert all(request["difficulty"] == "hard" for request in requests)
+    assert all(request["token"] == "stub-token" for request in requests)
+
+
+def test_refiller_tops_up_the_requested_bucket_and_survives_errors():
+    async def run():
+        batches = [[make_api_question(index, "medium") for index in range(4)]]
+        requests: list[dict] = []
+
+        async with serve_batches(batches, requests) as trivia_db:
+            bank = QuestionBank(config.QUESTION_BANK_PATH, trivia_db, low_watermark=0)
+            bank.open()
+            bank.request_refill(None, "medium")
+            bank.start_refilling()
+            try:
+                for _ in range(100):
+                    if bank.count(difficulty="medium"):
+                        break
+                    await asyncio.sleep(0.01)
+                refilled = bank.count(difficulty="medium")
+
+                # A broken database must not stop the refiller for good.
+                assert bank.connection is not None and bank.refill_task is not None
+                bank.connection.close()
+                bank.connection = None
+                bank.request_refill()
+                await asyncio.sleep(0.05)
+                return refilled, bank.refill_task.done()
+            finally:
+                await bank.stop_refilling()
+                bank.close()
+
+    assert asyncio.run(run()) == (4, False)
@@ -0,0 +1,88 @@
+import asyncio
+
+from conftest import make_session
+from session.bus import BroadcastMessage, UnixSocketBus
+from session.state import Player
+
+
+def make_message() -> BroadcastMessage:
+    session = make_session()
+    player = Player.new("player-0")
+    session.add_player(player)
+    session.activate_player(player.session_id)
+    return BroadcastMessage(
+        template_name="players.html",
+        game_session=session,
+        player_session_id=player.session_id,
+        audience="others",
+    )
+
+
+def make_bus(tmp_path) -> tuple[UnixSocketBus, list[BroadcastMessage]]:
+    bus = UnixSocketBus(tmp_path / "bus.sock")
+    bus.reconnect_delay = 0.01
+    received: list[BroadcastMessage] = []
+
+    async def handler(message: BroadcastMessage) -> None:
+        received.append(message)
+
+    bus.subscribe(handler)
+    return bus, received
+
+
+async def wait_for(predicate) -> None:
+    async with asyncio.timeout(5):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+def test_messages_are_relayed_to_the_other_workers(tmp_path):
+    async def run():
+        (broker, broker_received), (worker, worker_received) = (make_bus(tmp_path) for _ in "ab")
+        await broker.start()
+        await worker.start()
+        message = make_message()
+
+        try:
+            await worker.publish(message)
+            await wait_for(lambda: broker_received)
+        finally:
+            await worker.close()
+            await broker.close()
+
+        return message, broker_received, worker_received, broker.server, worker.server
+
+    message, broker_received, worker_received, broker_server, worker_server = asyncio.run(run())
+
+    assert broker_server is not None and worker_server is None
+    assert [relayed.model_dump() for relayed in broker_received] == [message.model_dump()]
+    assert worker_received == [message]
+
+
+def test_a_remaining_worker_takes_over_from_a_closed_broker(tmp_path):
+    async def run():
+        buses = [make_bus(tmp_path) for _ in range(3)]
+        for bus, _ in buses:
+            await bus.start()
+
+        (broker, _), (first, first_received), (second, second_received) = buses
+        await broker.close()
+        message = make_message()
+
+        try:
+            # Both survivors are connected once the new broker holds a peer for each of them.
+            await wait_for(
+                lambda: any(bus.server and len(bus.peers) == 2 for bus in (first, second))
+            )
+            await first.publish(message)
+            await wait_for(lambda: second_received)
+        finally:
+            await first.close()
+            await second.close()
+
+        return message, first_received, second_received
+
+    message, first_received, second_received = asyncio.run(run())
+
+    assert first_received == [message]
+    assert [relayed.model_dump() for relayed in second_received] == [message.model_dump()]
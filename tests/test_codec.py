@@ -0,0 +1,44 @@
+import msgspec
+from conftest import make_session
+from session.codec import SessionRecordV1, decode_session, encode_session
+from session.state import GameSession, Player
+
+
+def make_room() -> GameSession:
+    session = make_session()
+    for index in range(3):
+        session.add_player(Player.new(f"player-{index}"))
+    session.activate_player("player-0")
+    session.set_player_guess("player-0", session.current_question.answers[0].id)
+    return session
+
+
+def test_round_trip_restores_the_session():
+    session = make_room()
+
+    restored = GameSession.model_validate(decode_session(encode_session(session)))
+
+    assert restored.model_dump() == session.model_dump()
+    player = restored.find_player("player-0")
+    assert player is not None
+    assert player.current_guess == session.players[0].current_guess
+    assert restored.ready_count == 1
+
+
+def test_legacy_json_sessions_still_load():
+    session = make_room()
+
+    restored = GameSession.model_validate(decode_session(session.model_dump_json().encode()))
+
+    assert restored.model_dump() == session.model_dump()
+
+
+def test_older_records_fall_back_to_defaults():
+    session = make_room()
+    record = msgspec.convert(session, SessionRecordV1, from_attributes=True)
+    raw = msgspec.msgpack.encode((1, record))
+
+    restored = GameSession.model_validate(decode_session(raw))
+
+    assert restored.players == session.players
+    assert restored.seen_questions == set()
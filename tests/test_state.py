@@ -0,0 +1,100 @@
+import asyncio
+
+import config
+from conftest import make_manager, make_session
+
+PLAYERS = 200
+
+
+def test_concurrent_commands_are_all_applied():
+    async def run():
+        manager = make_manager()
+        session = make_session()
+        await manager.save_session(session)
+        player_ids = [f"player-{index:04}" for index in range(PLAYERS)]
+
+        await asyncio.gather(
+            *(manager.join_session(session.id, player_id) for player_id in player_ids)
+        )
+        answer_id = session.current_question.answers[0].id
+        await asyncio.gather(
+            *(
+                manager.set_player_guess(session.id, player_id, answer_id)
+                for player_id in player_ids
+            )
+        )
+        await manager.close()
+        return await manager.get_session(session.id)
+
+    session = asyncio.run(run())
+
+    assert len(session.players) == PLAYERS
+    assert session.active_count == PLAYERS
+    assert session.ready_count == PLAYERS
+    assert session.all_guessed
+
+
+def test_workers_sharing_a_store_apply_every_command(monkeypatch):
+    monkeypatch.setattr(config, "GAME_SESSION_WRITE_THROUGH", True)
+
+    async def run():
+        workers = [make_manager() for _ in range(2)]
+        session = make_session()
+        await workers[0].save_session(session)
+
+        # The room is visible to the other worker right away, without waiting for a flush.
+        await workers[1].get_session(session.id)
+
+        await asyncio.gather(
+            *(
+                workers[index % 2].join_session(session.id, f"player-{index:04}")
+                for index in range(PLAYERS)
+            )
+        )
+        return await workers[0].get_session(session.id, refresh=True)
+
+    session = asyncio.run(run())
+
+    assert len(session.players) == PLAYERS
+    assert session.version == PLAYERS
+
+
+def test_adopt_session_ignores_older_snapshots():
+    async def run():
+        manager = make_manager()
+        session = make_session()
+        await manager.save_session(session)
+        await manager.join_session(session.id, "player-0001")
+
+        stale = session.model_copy(update={"version": 0, "players": []})
+        await manager.adopt_session(stale)
+        newer = session.model_copy(update={"version": session.version + 1})
+        await manager.adopt_session(newer)
+        await manager.close()
+        return stale, newer, manager.sessions[session.id]
+
+    stale, newer, cached = asyncio.run(run())
+
+    assert cached is newer
+    assert cached is not stale
+
+
+def test_a_leave_for_an_earlier_connection_is_ignored(monkeypatch):
+    monkeypatch.setattr(config, "GAME_SESSION_WRITE_THROUGH", True)
+
+    async def run():
+        workers = [make_manager() for _ in range(2)]
+        session = make_session()
+        await workers[0].save_session(session)
+
+        joined = await workers[0].join_session(session.id, "player-0001")
+        joins = joined.get_player("player-0001").joins
+        # The player reconnects to the other worker before the first one's grace period ends.
+        await workers[1].join_session(session.id, "player-0001")
+        left = await workers[0].leave_session(session.id, "player-0001", joins)
+        return left, await workers[1].get_session(session.id, refresh=True)
+
+    left, session = asyncio.run(run())
+
+    assert left is None
+    assert session.is_active_player("player-0001")
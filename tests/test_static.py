@@ -0,0 +1,75 @@
+import litestar
+import pytest
+import static
+from litestar.testing import TestClient
+from static import IMMUTABLE, REVALIDATE, AssetManifest, etag_matches, static_asset, static_url
+
+CSS = "body { color: black; }\n" * 50
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    (tmp_path / "main.css").write_text(CSS)
+    manifest = AssetManifest(tmp_path)
+    manifest.build()
+    monkeypatch.setattr(static, "_MANIFEST", manifest)
+
+    with TestClient(litestar.Litestar(route_handlers=[static_asset])) as client:
+        yield client
+
+
+def test_each_encoding_has_its_own_etag(client):
+    plain = client.get("/static/main.css", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/static/main.css", headers={"Accept-Encoding": "gzip"})
+
+    assert plain.headers["etag"] != gzipped.headers["etag"]
+    assert gzipped.headers["etag"].endswith('-gzip"')
+    assert plain.headers["vary"] == gzipped.headers["vary"] == "Accept-Encoding"
+
+
+def test_brotli_is_preferred_and_has_its_own_etag(client):
+    brotli = client.get("/static/main.css", headers={"Accept-Encoding": "gzip, br"})
+    gzipped = client.get("/static/main.css", headers={"Accept-Encoding": "gzip"})
+
+    assert brotli.headers["content-encoding"] == "br"
+    assert brotli.headers["etag"].endswith('-br"')
+    assert brotli.headers["etag"] != gzipped.headers["etag"]
+    assert brotli.text == CSS
+
+
+def test_only_hashed_urls_are_cached_forever(client):
+    hashed = client.get(static_url("main.css"))
+    plain = client.get("/static/main.css")
+
+    assert static_url("main.css") != "/static/main.css"
+    assert hashed.headers["cache-control"] == IMMUTABLE
+    assert plain.headers["cache-control"] == REVALIDATE == "public, max-age=300"
+
+
+def test_not_modified_only_for_the_encoding_the_etag_names(client):
+    gzip_etag = client.get("/static/main.css", headers={"Accept-Encoding": "gzip"}).headers[
+        "etag"
+    ]
+
+    same = client.get(
+        "/static/main.css", headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_etag}
+    )
+    other = client.get(
+        "/static/main.css", headers={"Accept-Encoding": "identity", "If-None-Match": gzip_etag}
+    )
+
+    assert same.status_code == 304
+    assert same.headers["vary"] == "Accept-Encoding"
+    assert other.status_code == 200
+
+
+def test_if_none_match_lists_wildcards_and_weak_tags():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a", W/"c"', '"b"')
+    assert not etag_matches("", '"b"')
+
+
+def test_unknown_assets_are_not_found(client):
+    assert client.get("/static/missing.css").status_code == 404
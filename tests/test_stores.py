@@ -0,0 +1,36 @@
+import asyncio
+
+import config
+from litestar.stores.file import FileStore
+from stores import CachedStore, create_client_session_store
+
+
+def test_workers_share_client_sessions_without_the_cache(monkeypatch):
+    monkeypatch.setattr(config, "CLIENT_SESSION_CACHE", False)
+
+    async def run():
+        first, second = create_client_session_store(), create_client_session_store()
+        await first.set("session", "player-0001", expires_in=60)
+        seen = await second.get("session")
+        await second.delete("session")
+        return first, seen, await first.get("session")
+
+    store, seen, deleted = asyncio.run(run())
+
+    assert isinstance(store, FileStore)
+    assert seen == b"player-0001"
+    assert deleted is None
+
+
+def test_single_worker_serves_client_sessions_from_memory(monkeypatch):
+    monkeypatch.setattr(config, "CLIENT_SESSION_CACHE", True)
+
+    async def run():
+        store = create_client_session_store()
+        await store.set("session", "player-0001", expires_in=60)
+        return store, await store.get("session")
+
+    store, value = asyncio.run(run())
+
+    assert isinstance(store, CachedStore)
+    assert value == b"player-0001"
@@ -0,0 +1,365 @@
+import asyncio
+import collections
+from typing import NamedTuple, cast
+
+import config
+import litestar
+from api import OpenTriviaQuestion
+from conftest import make_api_question, make_manager, make_session
+from litestar.types import Scope
+from session import websocket
+from session.bus import BroadcastMessage
+from session.state import GameSessionManager, Player
+from session.timers import TimerScheduler
+from session.websocket import (
+    ClientData,
+    GameWebsocket,
+    GameWebsocketListener,
+    parse_journal_seq,
+    render_template,
+)
+
+
+class FakeSocket:
+    def __init__(self, player_session_id: str) -> None:
+        self.player_session_id = player_session_id
+        self.sent: dict[str, str] = {}
+
+    def enqueue(self, key: str, text: str) -> None:
+        self.sent[key] = text
+
+
+class BrokenSocket(GameWebsocket):
+    def __init__(self) -> None:
+        super().__init__(cast(Scope, {"type": "websocket", "path": "/", "headers": []}))
+        self.closes: list[int] = []
+
+    async def send_text(self, data: str | bytes, encoding: str = "utf-8") -> None:
+        raise ConnectionResetError
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        self.closes.append(code)
+
+
+class FakeApp:
+    def __init__(self) -> None:
+        self.events: list[str] = []
+
+    def emit(self, event_id: str, **kwargs) -> None:
+        self.events.append(event_id)
+
+
+class Worker(NamedTuple):
+    manager: GameSessionManager
+    scheduler: TimerScheduler
+    app: FakeApp
+
+    async def schedule_reveal(self, monkeypatch, session) -> None:
+        monkeypatch.setattr(websocket, "get_timer_scheduler", lambda: self.scheduler)
+        app = cast(litestar.Litestar, self.app)
+        await GameWebsocketListener.schedule_reveal(app, session, self.manager)
+
+
+def make_workers(monkeypatch) -> list[Worker]:
+    # Two workers sharing one store, each with its own timers, as with a unix broadcast bus.
+    monkeypatch.setattr(config, "GAME_SESSION_WRITE_THROUGH", True)
+    monkeypatch.setattr(config, "REVEAL_ANSWERS_DELAY", 0.02)
+    monkeypatch.setattr(config, "NEXT_QUESTION_DELAY", 0.02)
+
+    workers = [Worker(make_manager(), TimerScheduler(), FakeApp()) for _ in range(2)]
+    for worker in workers:
+        worker.manager.bank.open()
+    workers[0].manager.bank.add(
+        [OpenTriviaQuestion.model_validate(make_api_question(index)) for index in range(5)]
+    )
+    return workers
+
+
+async def start_round(worker: Worker, monkeypatch):
+    session = make_session()
+    await worker.manager.save_session(session)
+    answer_id = session.current_question.answers[0].id
+    for player_id in ("player-0", "player-1"):
+        await worker.manager.join_session(session.id, player_id)
+        session = await worker.manager.set_player_guess(session.id, player_id, answer_id)
+
+    await worker.schedule_reveal(monkeypatch, session)
+    return session
+
+
+def make_large_room():
+    session = make_session()
+    for index in range(config.LARGE_ROOM_THRESHOLD + 10):
+        player = Player.new(f"player-{index:04}")
+        player.active = True
+        session.add_player(player)
+    return session
+
+
+def deliver_all(messages: list[BroadcastMessage]) -> None:
+    async def run():
+        for message in messages:
+            await GameWebsocketListener.deliver(message)
+
+    asyncio.run(run())
+
+
+def deliver(session, template_name: str, sockets: list[FakeSocket]) -> None:
+    GameWebsocketListener.sockets[session.id] = cast(list[GameWebsocket], sockets)
+    try:
+        message = BroadcastMessage(template_name=template_name, game_session=session)
+        asyncio.run(GameWebsocketListener.deliver(message))
+    finally:
+        GameWebsocketListener.forget_room(session.id)
+
+
+def resume(socket: FakeSocket, session, seq: str) -> None:
+    GameWebsocketListener.resume(cast(GameWebsocket, socket), session, parse_journal_seq(seq))
+
+
+def test_players_past_the_first_page_get_their_own_row():
+    session = make_large_room()
+    on_page, past_page = session.players[0], session.players[-1]
+    sockets = [FakeSocket(on_page.session_id), FakeSocket(past_page.session_id)]
+
+    deliver(session, "players.html", sockets)
+    on_page_text, past_page_text = (socket.sent["players.html:"] for socket in sockets)
+
+    assert f'id="player-you-{on_page.session_id}"' in on_page_text
+    assert 'hx-swap-oob="beforeend"' not in on_page_text
+    assert f'id="player-{past_page.session_id}"' not in on_page_text
+    assert 'hx-swap-oob="beforeend"' in past_page_text
+    assert f'id="player-{past_page.session_id}"' in past_page_text
+
+
+def test_room_page_renders_the_players_own_row_past_the_first_page():
+    session = make_large_room()
+    past_page = session.players[-1]
+
+    data = ClientData(player_session_id=past_page.session_id, game_session=session)
+    text = render_template("players.html", data.as_context())
+
+    assert f'id="player-{past_page.session_id}"' in text
+    assert "(that's you)" in text
+
+
+def test_simultaneous_joins_render_the_player_list_once(monkeypatch):
+    monkeypatch.setattr(config, "BROADCAST_COALESCE_WINDOW", 0.2)
+    monkeypatch.setattr(config, "LARGE_ROOM_UPDATE_WINDOW", 0.2)
+
+    renders = collections.Counter()
+
+    def count_render(template_name, context):
+        renders[template_name] += 1
+        return render_template(template_name, context)
+
+    monkeypatch.setattr(websocket, "render_template", count_render)
+
+    session = make_session()
+    sockets: list[FakeSocket] = []
+    GameWebsocketListener.sockets[session.id] = cast(list[GameWebsocket], sockets)
+    debouncer = websocket.get_broadcast_debouncer()
+    submitted = debouncer.submitted
+
+    async def join_everyone():
+        bus = websocket.get_broadcast_bus()
+        bus.subscribe(GameWebsocketListener.deliver)
+        try:
+            for index in range(100):
+                player = Player.new(f"player-{index:04}")
+                player.active = True
+                session.add_player(player)
+                sockets.append(FakeSocket(player.session_id))
+                await websocket.update_players_after_join.fn(
+                    game_session=session, player_session_id=player.session_id
+                )
+
+            await asyncio.sleep(0.3)
+        finally:
+            bus.handlers.remove(GameWebsocketListener.deliver)
+
+    try:
+        asyncio.run(join_everyone())
+    finally:
+        GameWebsocketListener.forget_room(session.id)
+
+    assert debouncer.submitted - submitted >= 100
+    # Each joiner gets their own list right away, the room shares a single render.
+    assert renders["players.html"] == 100 + 1
+    assert renders["player-joined.html"] == 0
+    assert all("players.html:" in socket.sent for socket in sockets)
+
+
+def test_a_guessers_own_answers_are_not_held_back(monkeypatch):
+    monkeypatch.setattr(config, "BROADCAST_COALESCE_WINDOW", 10.0)
+
+    session = make_session()
+    player = Player.new("player-0000")
+    session.add_player(player)
+    socket = FakeSocket(player.session_id)
+    GameWebsocketListener.sockets[session.id] = cast(list[GameWebsocket], [socket])
+
+    async def guess():
+        bus = websocket.get_broadcast_bus()
+        bus.subscribe(GameWebsocketListener.deliver)
+        try:
+            for listener in (
+                websocket.update_player_status_after_guess,
+                websocket.update_answers_after_guess,
+            ):
+                await listener.fn(game_session=session, player_session_id=player.session_id)
+        finally:
+            bus.handlers.remove(GameWebsocketListener.deliver)
+
+    try:
+        asyncio.run(guess())
+    finally:
+        GameWebsocketListener.forget_room(session.id)
+
+    assert set(socket.sent) == {f"answers.html:{player.session_id}", "state-version.html"}
+
+
+def test_large_rooms_get_counts_and_only_the_statuses_they_show(monkeypatch):
+    monkeypatch.setattr(config, "LARGE_ROOM_UPDATE_WINDOW", 0)
+
+    session = make_large_room()
+    on_page, past_page = session.players[0], session.players[-1]
+    sockets = [FakeSocket(on_page.session_id), FakeSocket(past_page.session_id)]
+    GameWebsocketListener.sockets[session.id] = cast(list[GameWebsocket], sockets)
+    answer_id = session.current_question.answers[0].id
+
+    async def guess_on_both_pages():
+        bus = websocket.get_broadcast_bus()
+        bus.subscribe(GameWebsocketListener.deliver)
+        try:
+            for player in (on_page, past_page):
+                session.set_player_guess(player.session_id, answer_id)
+                await websocket.update_player_status_after_guess.fn(
+                    game_session=session, player_session_id=player.session_id
+                )
+        finally:
+            bus.handlers.remove(GameWebsocketListener.deliver)
+
+    try:
+        asyncio.run(guess_on_both_pages())
+    finally:
+        GameWebsocketListener.forget_room(session.id)
+
+    on_page_sent, past_page_sent = (set(socket.sent) for socket in sockets)
+    assert on_page_sent == {
+        "players-summary.html:",
+        f"player-status.html:{on_page.session_id}",
+        "state-version.html",
+    }
+    assert past_page_sent == on_page_sent | {f"player-status.html:{past_page.session_id}"}
+    assert "2 ready" in sockets[0].sent["players-summary.html:"]
+
+
+def test_broadcasts_to_a_socket_whose_sender_failed_are_dropped():
+    socket = BrokenSocket()
+
+    async def run():
+        socket.enqueue("players.html:", "<div></div>")
+        await asyncio.sleep(0.01)
+
+        for index in range(config.SOCKET_OUTBOX_SIZE + 10):
+            socket.enqueue(f"player-joined.html:{index}", "<div></div>")
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+
+    assert socket.closed
+    assert socket.sender_task is not None
+    assert socket.sender_task.done()
+    assert not socket.outbox
+    assert socket.closes == []
+
+
+def test_resume_replays_broadcasts_that_did_not_bump_the_version():
+    session = make_session()
+    player = Player.new("player-0000")
+    player.active = True
+    session.add_player(player)
+
+    def message(template_name: str, version: int) -> BroadcastMessage:
+        return BroadcastMessage(
+            template_name=template_name,
+            game_session=session.model_copy(update={"version": version}),
+            player_session_id=player.session_id,
+        )
+
+    # Only rooms with a socket on this worker are journaled.
+    connected = FakeSocket(player.session_id)
+    GameWebsocketListener.sockets[session.id] = cast(list[GameWebsocket], [connected])
+    try:
+        deliver_all(
+            [
+                message("player-status.html", 1),
+                message("player-status.html", 2),
+                message("revealed-answers.html", 2),
+            ]
+        )
+        session.version = 2
+
+        seen_status = FakeSocket(player.session_id)
+        resume(seen_status, session, "2.0")
+        seen_everything = FakeSocket(player.session_id)
+        resume(seen_everything, session, "2.1")
+        page = FakeSocket(player.session_id)
+        resume(page, session, "2")
+    finally:
+        GameWebsocketListener.forget_room(session.id)
+
+    assert set(seen_status.sent) == {"revealed-answers.html:resume", "state-version.html"}
+    assert 'value="2.1"' in seen_status.sent["state-version.html"]
+    assert seen_everything.sent == {}
+    assert set(page.sent) == {
+        "players.html:resume",
+        "revealed-answers.html:resume",
+        "state-version.html",
+    }
+
+
+def test_a_guess_taken_back_on_another_worker_cancels_the_reveal(monkeypatch):
+    first, second = make_workers(monkeypatch)
+
+    async def run():
+        session = await start_round(first, monkeypatch)
+        await second.manager.unset_player_guess(session.id, "player-0")
+        await asyncio.sleep(0.1)
+        return session, await second.manager.get_session(session.id, refresh=True)
+
+    started, session = asyncio.run(run())
+
+    assert first.app.events == second.app.events == []
+    assert session.round_timer is None
+    assert session.current_question.id == started.current_question.id
+
+
+def test_a_guess_on_another_worker_does_not_reveal_the_round_twice(monkeypatch):
+    first, second = make_workers(monkeypatch)
+
+    async def run():
+        session = await start_round(first, monkeypatch)
+        answer_id = session.current_question.answers[1].id
+        session = await second.manager.set_player_guess(session.id, "player-0", answer_id)
+        await second.schedule_reveal(monkeypatch, session)
+        await asyncio.sleep(0.1)
+        return session, await second.manager.get_session(session.id, refresh=True)
+
+    started, session = asyncio.run(run())
+
+    assert first.app.events == [websocket.RevealAnswers, websocket.NextQuestion]
+    assert second.app.events == []
+    assert session.current_question.id != started.current_question.id
+    assert len(session.seen_questions) == 1
+    assert session.round_timer is None
+    assert not session.answers_revealed
+
+
+def test_rooms_without_sockets_here_are_not_journaled():
+    session = make_session()
+
+    deliver_all([BroadcastMessage(template_name="players.html", game_session=session)])
+
+    assert session.id not in GameWebsocketListener.journals